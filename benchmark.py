@@ -0,0 +1,460 @@
+"""
+BENCHMARK: Scraping Agent hot path
+
+Measures per-page CPU time of the agent's parsing/planning/extraction steps
+on a large synthetic listing page, no MCP server or browser required.
+
+Run this with: python benchmark.py [num_items]
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+from src.agent.agent import ScrapeAgent
+from src.agent.config_models import ScrapeConfig
+from src.agent.cpu_pool import CpuPool, ExtractedPage
+from src.agent.document import ParsedDocument
+from src.agent.extractor import Extractor, caster_for, find_next_link
+from src.agent.page_cache import PageCache
+from src.agent.schema_analyser import SchemaAnalyser
+from src.agent.select_planner import SelectorPlan, SelectorPlanner
+from src.agent.selector_engine import candidate_value
+
+SCHEMA = {
+    "products": [
+        {
+            "name": "string",
+            "price": "number",
+            "description": "string",
+            "availability": "boolean",
+            "specifications": {
+                "cpu": "string",
+                "ram": "string"
+            }
+        }
+    ]
+}
+
+def make_listing_html(num_items: int) -> str:
+    """Build a listing page shaped like page1.html with num_items product cards."""
+    cards = []
+    for i in range(num_items):
+        stock = "In stock" if i % 3 else "Out of stock"
+        cards.append(f"""
+  <div class="product card">
+    <h2 class="product-title">Laptop {i}</h2>
+    <div class="product-price">${500 + i}.99</div>
+    <p class="product-description">Model {i}, powerful and lightweight with a long battery life.</p>
+    <img class="product-image" src="/images/laptop-{i}.jpg" alt="Laptop {i}">
+    <div aria-label="{stock.lower()}">{stock}</div>
+    <ul class="specs">
+      <li data-cpu="Intel i{3 + i % 3 * 2}">Intel i{3 + i % 3 * 2}</li>
+      <li data-ram="{8 * (1 + i % 4)}GB DDR5">{8 * (1 + i % 4)}GB DDR5</li>
+    </ul>
+  </div>""")
+
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head><meta charset="utf-8"><title>Benchmark Shop</title></head>
+<body>{"".join(cards)}
+  <a rel="next" href="/page2.html">Next »</a>
+</body>
+</html>
+"""
+
+def cpu_time(func, repeat: int = 3) -> float:
+    """Best of `repeat` runs in CPU seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.process_time()
+        func()
+        best = min(best, time.process_time() - start)
+    return best
+
+def bench_single_parse(html: str) -> None:
+    """Planner + extractor + next link on raw HTML (three parses) vs one shared ParsedDocument."""
+    analyser = SchemaAnalyser(SCHEMA)
+    agent = ScrapeAgent(client=None, config=ScrapeConfig(url="https://example.com", schema=SCHEMA))
+
+    def from_raw_html():
+        plan = SelectorPlanner(html, analyser.collection_name, analyser.item_fields).build_plan()
+        Extractor(html, plan, analyser.item_fields).run()
+        agent._find_next_link(html)
+
+    def from_parsed_document():
+        doc = ParsedDocument(html)
+        plan = SelectorPlanner(doc, analyser.collection_name, analyser.item_fields).build_plan()
+        Extractor(doc, plan, analyser.item_fields).run()
+        agent._find_next_link(doc)
+
+    before = cpu_time(from_raw_html)
+    after = cpu_time(from_parsed_document)
+    print(f"  per page, HTML parsed 3x:        {before * 1000:8.1f} ms")
+    print(f"  per page, shared ParsedDocument: {after * 1000:8.1f} ms ({before / after:.2f}x)")
+
+def bench_selector_engine(html: str) -> None:
+    """Per candidate select_one() with CSS strings vs the compiled single pass engine."""
+    analyser = SchemaAnalyser(SCHEMA)
+    doc = ParsedDocument(html)
+    plan = SelectorPlanner(doc, analyser.collection_name, analyser.item_fields).build_plan()
+    compiled = plan.compiled()
+    containers = compiled.containers(doc.soup)
+
+    def string_selectors():
+        for container in containers:
+            for selectors in plan.field_selectors.values():
+                for sel in selectors:
+                    el = container.select_one(sel)
+                    if el is not None and candidate_value(doc.backend, el):
+                        break
+
+    def compiled_engine():
+        for container in containers:
+            compiled.first_values(container)
+
+    before = cpu_time(string_selectors)
+    after = cpu_time(compiled_engine)
+    candidates = sum(len(c) for c in plan.field_selectors.values())
+    print(f"  {len(containers)} containers x {candidates} candidate selectors")
+    print(f"  select_one per candidate:        {before * 1000:8.1f} ms")
+    print(f"  compiled single pass engine:     {after * 1000:8.1f} ms ({before / after:.2f}x)")
+
+def bench_backends(html: str) -> None:
+    """Full per page pipeline (parse, plan, extract, next link) on each parser backend."""
+    analyser = SchemaAnalyser(SCHEMA)
+    results = {}
+
+    for backend in ("bs4", "lxml"):
+        config = ScrapeConfig(url="https://example.com", schema=SCHEMA, options={"parser_backend": backend})
+        agent = ScrapeAgent(client=None, config=config)
+
+        def pipeline():
+            doc = ParsedDocument(html, backend=backend)
+            plan = SelectorPlanner(doc, analyser.collection_name, analyser.item_fields).build_plan()
+            items, _ = Extractor(doc, plan, analyser.item_fields).run()
+            agent._find_next_link(doc)
+            results[backend] = items
+
+        elapsed = cpu_time(pipeline)
+        pages_per_sec = 1 / elapsed if elapsed else float("inf")
+        print(f"  {backend:5s} backend: {elapsed * 1000:8.1f} ms/page  {pages_per_sec:6.1f} pages/s")
+
+    identical = results["bs4"] == results["lxml"]
+    print(f"  identical output: {identical} ({len(results['bs4'])} items)")
+
+def bench_plan_refinement(html: str) -> None:
+    """Extraction of page 2..N with the full candidate plan vs the plan refined on page 1."""
+    analyser = SchemaAnalyser(SCHEMA)
+    doc = ParsedDocument(html)
+    plan = SelectorPlanner(doc, analyser.collection_name, analyser.item_fields).build_plan()
+    _, quality_info = Extractor(doc, plan, analyser.item_fields).run()
+    refined = plan.refined(quality_info["selector_hits"])
+
+    before = cpu_time(lambda: Extractor(doc, plan, analyser.item_fields).run())
+    after = cpu_time(lambda: Extractor(doc, refined, analyser.item_fields).run())
+    full = sum(len(c) for c in plan.field_selectors.values())
+    kept = sum(len(c) for c in refined.field_selectors.values())
+    print(f"  primary candidates: {full} -> {kept}")
+    print(f"  extraction, full plan:           {before * 1000:8.1f} ms")
+    print(f"  extraction, refined plan:        {after * 1000:8.1f} ms ({before / after:.2f}x)")
+
+def bench_wire_size(html: str) -> None:
+    """JSON body of the html tool vs the extract tool's rows for the same page."""
+    analyser = SchemaAnalyser(SCHEMA)
+    doc = ParsedDocument(html)
+    plan = SelectorPlanner(doc, analyser.collection_name, analyser.item_fields).build_plan()
+    compiled = plan.compiled()
+
+    # Same shape the extract tool returns: [value, candidate index] per field
+    fields = list(plan.field_selectors)
+    rows = []
+    for container in compiled.containers(doc.root):
+        values = compiled.first_values(container)
+        row = []
+        for field in fields:
+            value, winner = values[field]
+            row.append([value, plan.field_selectors[field].index(winner)] if value else None)
+        rows.append(row)
+
+    html_body = len(json.dumps({"ok": True, "data": {"html": html}}))
+    extract_body = len(json.dumps({"ok": True, "data": {"fields": fields, "rows": rows}}))
+    print(f"  html tool response:              {html_body / 1024:8.1f} KB")
+    print(f"  extract tool response:           {extract_body / 1024:8.1f} KB ({html_body / extract_body:.1f}x smaller)")
+
+async def loop_stall(work) -> tuple[float, float]:
+    """Longest gap between the 1 ms ticks of another task while work() runs, and work's wall time."""
+    gaps = []
+    running = True
+
+    async def ticker():
+        last = time.perf_counter()
+        while running:
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    task = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    await work()
+    wall = time.perf_counter() - start
+    running = False
+    await task
+    return max(gaps), wall
+
+def bench_cpu_pool(html: str, pages: int = 8) -> None:
+    """Pages parsed and extracted inside the event loop vs in a CpuPool, seen from another task on the loop."""
+    analyser = SchemaAnalyser(SCHEMA)
+    plan = SelectorPlanner(ParsedDocument(html), analyser.collection_name, analyser.item_fields).build_plan()
+    fields = analyser.item_fields
+    workers = os.cpu_count() or 1
+
+    async def in_loop():
+        for _ in range(pages):
+            doc = ParsedDocument(html)
+            Extractor(doc, plan, fields).run()
+            find_next_link(doc)
+            await asyncio.sleep(0)
+
+    async def run():
+        pool = CpuPool(workers)
+        try:
+            # Spawn the workers and ship them the plan before measuring
+            await asyncio.gather(*(pool.extract(html, "bs4", plan, fields) for _ in range(workers * 2)))
+
+            async def in_pool():
+                await asyncio.gather(*(pool.extract(html, "bs4", plan, fields) for _ in range(pages)))
+
+            return await loop_stall(in_loop), await loop_stall(in_pool)
+        finally:
+            pool.shutdown()
+
+    (loop_gap, loop_wall), (pool_gap, pool_wall) = asyncio.run(run())
+    print(f"  {pages} pages, {workers} worker process(es)")
+    print(f"  in event loop:  wall {loop_wall * 1000:8.1f} ms, longest loop stall {loop_gap * 1000:7.1f} ms")
+    print(f"  CpuPool:        wall {pool_wall * 1000:8.1f} ms, longest loop stall {pool_gap * 1000:7.1f} ms")
+
+# Price, availability and date strings as they show up on shop pages
+PRICE_FORMATS = [
+    lambda a: f"${a:,.2f}",
+    lambda a: f"€{a:,.2f}",
+    lambda a: f"{a:,.2f} kr".replace(",", " ").replace(".", ","),
+    lambda a: f"{a:,.2f} €".replace(",", "_").replace(".", ",").replace("_", "."),
+    lambda a: f"CHF {a:,.2f}".replace(",", "'"),
+    lambda a: f"£{a:.0f}",
+    lambda a: f"Price: ${a:.2f}",
+    lambda a: f"From USD {a:,.0f}",
+    lambda a: f"Now {a:.2f} (was {a * 1.2:.2f})",
+    lambda a: "Call for price",
+]
+AVAILABILITY_SAMPLES = ["In stock", "Out of stock", "Available", "Unavailable", "Only 3 left in stock",
+                        "Sold out", "In Stock - ships in 2 days", "Currently unavailable", "Pre-order", "Yes"]
+DATE_SAMPLES = ["2024-05-01", "2024-05-01T10:30:00Z", "01/05/2024", "2024-05-01 10:30:00+02:00"]
+
+def legacy_cast_value(raw_text, expected_type):
+    """The per value cast the Extractor used before field casters were precompiled."""
+    if raw_text is None:
+        return None
+    text = raw_text.strip()
+    if not text:
+        return None
+    t = expected_type.lower()
+    if t == "string":
+        return text
+    if t == "number":
+        match = re.search(r"[0-9]+(?:[.,][0-9]+)?", text)
+        if not match:
+            return None
+        num_txt = match.group(0).replace(",", ".")
+        try:
+            float_val = float(num_txt)
+            return int(float_val) if float_val.is_integer() else float(num_txt)
+        except ValueError:
+            return None
+    if t == "boolean":
+        lowered = text.lower()
+        if any(word in lowered for word in ["in stock", "available", "yes", "true", "1", "instock"]):
+            return True
+        if any(word in lowered for word in ["out of stock", "unavailable", "no", "false", "0"]):
+            return False
+        return None
+    if t == "datetime":
+        try:
+            return datetime.fromisoformat(text.replace("Z", "+00:00")).isoformat()
+        except ValueError:
+            return None
+    return text
+
+def bench_casting(num_values: int) -> None:
+    """Per value type dispatch with uncompiled patterns vs casters chosen once per field."""
+    rng = random.Random(0)
+    # Shop prices cluster on "charm" amounts, x.99 / x.95 / x.00, but most values are still distinct
+    amounts = lambda: rng.randrange(5, 3000) + rng.choice((0.99, 0.95, 0.0, 0.5))
+    corpus = [("number", rng.choice(PRICE_FORMATS)(amounts())) for _ in range(num_values)]
+    corpus += [("boolean", rng.choice(AVAILABILITY_SAMPLES)) for _ in range(num_values)]
+    corpus += [("datetime", rng.choice(DATE_SAMPLES)) for _ in range(num_values // 4)]
+    corpus += [("string", f" Laptop {i} ") for i in range(num_values)]
+    columns = {t: [raw for kind, raw in corpus if kind == t] for t in ("number", "boolean", "datetime", "string")}
+
+    def per_value():
+        for kind, raw in corpus:
+            legacy_cast_value(raw, kind)
+
+    def per_field():
+        for kind, values in columns.items():
+            cast = caster_for(kind)
+            if hasattr(cast, "cache_clear"):
+                cast.cache_clear() # Every run starts cold
+            for raw in values:
+                cast(raw)
+
+    before = cpu_time(per_value, repeat=5)
+    after = cpu_time(per_field, repeat=5)
+    print(f"  {len(corpus)} values (prices, availability, dates, names)")
+    print(f"  cast per value:                  {before * 1000:8.1f} ms")
+    print(f"  precompiled field casters:       {after * 1000:8.1f} ms ({before / after:.2f}x)")
+    cast_number = caster_for("number")
+    for raw in ("€1,099.50", "1 299,00 kr", "1.299,00 €", "Pack of 2 100ml"):
+        print(f"  {raw!r:>15}: {legacy_cast_value(raw, 'number')!r} -> {cast_number(raw)!r}")
+
+def make_grid_html(num_items: int, per_row: int = 4) -> str:
+    """Cards with neutral class names and unique data-ids, split over grid rows, below a keyword named menu."""
+    menu = "".join(f'<li class="nav-item"><a href="/c/{i}">Category {i}</a></li>' for i in range(40))
+    rows = []
+    for start in range(0, num_items, per_row):
+        tiles = "".join(f"""
+      <div class="tile" data-id="sku-{i}">
+        <a href="/p/{i}"><img src="/img/{i}.jpg" alt="Laptop {i}"></a>
+        <h3>Laptop {i}</h3>
+        <span class="amount">${500 + i}.99</span>
+        {'<span class="badge">Sale</span>' if i % 5 == 0 else ''}
+        <button class="buy">Add to cart</button>
+      </div>""" for i in range(start, min(start + per_row, num_items)))
+        rows.append(f'\n    <div class="grid-row">{tiles}\n    </div>')
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head><meta charset="utf-8"><title>Grid Shop</title></head>
+<body>
+  <ul class="menu">{menu}</ul>
+  <main id="results">{"".join(rows)}
+  </main>
+  <footer><ul class="links"><li class="footer-item"><a href="/about">About</a></li><li class="footer-item"><a href="/help">Help</a></li></ul></footer>
+</body>
+</html>
+"""
+
+def legacy_find_item_selector(doc: ParsedDocument):
+    """The item detection SelectorPlanner used before: three selects over the whole document and a Counter."""
+    backend = doc.backend
+    keywords = ["product", "card", "item", "listing", "result", "post", "entry", "record"]
+
+    def to_selector(el):
+        for attr in ("data-testid", "data-id"):
+            if backend.get_attr(el, attr) is not None:
+                return f"[{attr}='{backend.get_attr(el, attr)}']"
+        classes = backend.classes(el)
+        return "." + ".".join(classes) if classes else None
+
+    candidates = [to_selector(el) for el in doc.select("div[data-testid], div[data-id]")]
+    candidates += [to_selector(el) for el in doc.select("div[class]")
+                   if any(kw in " ".join(backend.classes(el)).lower() for kw in keywords)]
+    candidates += [to_selector(el) for el in doc.select("li[class], article[class], section.item, div.item")]
+    candidates = [c for c in candidates if c]
+    return Counter(candidates).most_common(1)[0][0] if candidates else None
+
+def bench_item_detection(num_items: int) -> None:
+    """Keyword selects + Counter vs the single pass sibling group analysis, on a grid page and the listing page."""
+    for label, html in (("grid page", make_grid_html(num_items)), ("listing page", make_listing_html(num_items))):
+        doc = ParsedDocument(html)
+        planner = SelectorPlanner(doc, "products", {})
+        before = cpu_time(lambda: legacy_find_item_selector(doc))
+        after = cpu_time(planner._find_reapeated_item_selector)
+        nodes = sum(1 for _ in doc.backend.iter_elements(doc.root))
+        print(f"  {label}, {nodes} elements")
+        print(f"    keyword selects:   {before * 1000:8.1f} ms -> {legacy_find_item_selector(doc)}")
+        print(f"    sibling groups:    {after * 1000:8.1f} ms -> {planner._find_reapeated_item_selector()}")
+
+def bench_verified_fields(html: str) -> None:
+    """Extraction with every field name guess as a candidate vs the selectors verified on sampled items."""
+    analyser = SchemaAnalyser(SCHEMA)
+    for backend in ("bs4", "lxml"):
+        doc = ParsedDocument(html, backend=backend)
+        planner = SelectorPlanner(doc, analyser.collection_name, analyser.item_fields, backend=backend)
+        verified = planner.build_plan()
+        guessed = SelectorPlan(verified.item_selector, {f: planner._find_field_selectors(f) for f in analyser.item_fields})
+        before = cpu_time(lambda: Extractor(doc, guessed, analyser.item_fields, backend=backend).run(), repeat=5)
+        after = cpu_time(lambda: Extractor(doc, verified, analyser.item_fields, backend=backend).run(), repeat=5)
+        same = Extractor(doc, guessed, analyser.item_fields, backend=backend).run()[0] == Extractor(doc, verified, analyser.item_fields, backend=backend).run()[0]
+        candidates = lambda plan: sum(len(sels) for sels in plan.field_selectors.values())
+        print(f"  {backend}:")
+        print(f"    name guesses ({candidates(guessed):3d} candidates): {before * 1000:8.1f} ms")
+        print(f"    verified     ({candidates(verified):3d} candidates): {after * 1000:8.1f} ms ({before / after:.2f}x, same items: {same})")
+
+def bench_page_cache(html: str) -> None:
+    """A page parsed and extracted again vs served from the page cache because its HTML did not change."""
+    analyser = SchemaAnalyser(SCHEMA)
+    fields = analyser.item_fields
+    plan = SelectorPlanner(ParsedDocument(html), analyser.collection_name, fields).build_plan()
+    cache_dir = tempfile.mkdtemp(prefix="page_cache_")
+    try:
+        cache = PageCache(cache_dir)
+        url = "https://example.com/page2.html"
+
+        def extract():
+            doc = ParsedDocument(html)
+            items, quality_info = Extractor(doc, plan, fields).run()
+            return ExtractedPage(items, quality_info, find_next_link(doc), len(html))
+
+        cache.store(cache.key(url, PageCache.html_hash(html), plan, fields), url, extract())
+        before = cpu_time(extract)
+        after = cpu_time(lambda: cache.load(cache.key(url, PageCache.html_hash(html), plan, fields)))
+        print(f"  parse + extract:                 {before * 1000:8.1f} ms")
+        print(f"  hash + cache hit:                {after * 1000:8.1f} ms ({before / after:.1f}x)")
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+def main():
+    num_items = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    html = make_listing_html(num_items)
+    print(f"Synthetic listing: {num_items} items, {len(html) / 1024 / 1024:.2f} MB")
+
+    print("\n1) Single parse pipeline")
+    bench_single_parse(html)
+
+    print("\n2) Selector execution")
+    bench_selector_engine(html)
+
+    print("\n3) Parser backends")
+    bench_backends(html)
+
+    print("\n4) Plan refinement")
+    bench_plan_refinement(html)
+
+    print("\n5) Browser side extraction")
+    bench_wire_size(html)
+
+    print("\n6) Type casting")
+    bench_casting(num_items * 20)
+
+    print("\n7) CPU pool")
+    bench_cpu_pool(html)
+
+    print("\n8) Item detection")
+    bench_item_detection(num_items * 4)
+
+    print("\n9) Verified field selectors")
+    bench_verified_fields(html)
+
+    print("\n10) Page cache")
+    bench_page_cache(html)
+
+if __name__ == "__main__":
+    main()
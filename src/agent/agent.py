@@ -1,16 +1,26 @@
 import asyncio
-from urllib.parse import urljoin
+import re
+from urllib.parse import urljoin, urlparse
 from datetime import datetime
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Tuple
 
-from bs4 import BeautifulSoup
-from src.agent.config_models import ScrapeConfig
+from src.agent.config_models import ScrapeConfig, ExtractionMode, FetchMode
+from src.agent.document import ParsedDocument
 from src.agent.mcp_client import MCPClient
-from src.agent.retry import retry_async
+from src.agent.retry import retry_async, RetryBudget, CircuitBreaker
 from src.agent.schema_analyser import SchemaAnalyser
-from src.agent.select_planner import SelectorPlanner
-from src.agent.extractor import Extractor
+from src.agent.select_planner import SelectorPlanner, SelectorPlan
+from src.agent.extractor import Extractor, BrowserExtraction, find_next_link
 from src.agent.result_formatter import ResultFormatter
+from src.agent.result_writer import ResultWriter, open_writer
+from src.agent.quality import QualityAccumulator
+from src.agent.cpu_pool import CpuPool, ExtractedPage
+from src.agent.plan_cache import PlanCache
+from src.agent.page_cache import PageCache
+from src.agent.static_fetcher import StaticFetcher
+
+# Completion rate a statically fetched page may lose against page 1 before the browser takes over
+STATIC_QUALITY_TOLERANCE = 0.2
 
 class ScrapeAgent:
     """
@@ -23,21 +33,56 @@ class ScrapeAgent:
     6. Produces formatted output
     """
     
-    def __init__(self, client: MCPClient, config: ScrapeConfig):
+    def __init__(self, client: MCPClient, config: ScrapeConfig, breaker: CircuitBreaker | None = None, cpu_pool: CpuPool | None = None):
         self.client = client
         self.config = config
+        # Worker processes for parsing/planning/extraction, a pool passed in is shared and not shut down by this agent
+        workers = config.options.cpu_workers if config.options else 0
+        self.cpu_pool: CpuPool | None = cpu_pool if cpu_pool is not None else (CpuPool(workers) if workers > 0 else None)
+        self._owns_cpu_pool = cpu_pool is None and self.cpu_pool is not None
+        # Retries are drawn from one budget per job, the breaker is per target host and may be shared between agents
+        self.retry_budget = RetryBudget(config.options.retry_budget if config.options else 10)
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
         self.schema_analyser: SchemaAnalyser | None = None
         self.formatter: ResultFormatter | None = None
+        self.plan_cache: PlanCache | None = PlanCache() if config.options and config.options.plan_cache else None
+        # Extracted pages by URL + HTML hash + plan version, unchanged pages skip parsing and extraction
+        self.page_cache: PageCache | None = (
+            PageCache(max_bytes=config.options.page_cache_mb * 1024 * 1024) if config.options and config.options.page_cache else None
+        )
+        self.selector_plan: SelectorPlan | None = None
+        # field -> selector -> number of items it supplied, summed over all pages
+        self.selector_hits: Dict[str, Dict[str, int]] = {}
+        self._plan_key: str | None = None
+        self._plan_from_cache = False
+        self._plan_refined = False # selector_plan was refined with page 1's hits in this run
+        self._current_url = "" # URL the agent's own session ended up on after the last page load
+        # Requests blocked/loaded by the browser over all pages, only tracked when blocking is configured
+        self.resource_stats: Dict[str, Any] = {}
+        # Plain HTTP fetching for server rendered pages (options.fetch_mode)
+        self.static_fetcher: StaticFetcher | None = None
+        self._static = bool(config.options and config.options.fetch_mode == FetchMode.STATIC)
+        self._baseline_rate: float | None = None # Page 1 completion rate, static pages are compared against it
+        # Pages loaded per path, probes are the fetch_mode auto test fetches of page 1 without the browser
+        self.fetch_stats: Dict[str, int] = {"browser": 0, "static": 0, "probes": 0, "fallbacks": 0}
+        # Streams items to options.output_path as pages are extracted, None keeps them in memory
+        self.writer: ResultWriter | None = None
+        # Quality counters of all pages collected so far
+        self.quality = QualityAccumulator()
     
+    def _parser_backend(self) -> str:
+        opts = self.config.options
+        return opts.parser_backend.value if opts else "bs4"
+
     def _should_retry(self) -> bool:
         opts = self.config.options
         return opts.retry_failed if opts else False
     
-    async def _call_with_retry(self, coro_factory, *, retries_if_on: int = 3):
-        if self._should_retry():
-            return await retry_async(coro_factory, retries=retries_if_on)
-        else:
-            return await coro_factory()
+    async def _call_with_retry(self, coro_factory, *, url: str | None = None, retries_if_on: int = 3):
+        """Run coro_factory() under the job's retry budget and the circuit breaker of url's host."""
+        retries = retries_if_on if self._should_retry() else 0
+        host = urlparse(url).netloc if url else None
+        return await retry_async(coro_factory, retries=retries, budget=self.retry_budget, breaker=self.breaker, host=host)
     
     # ===== STEP 1: Schema Analysis =====
     
@@ -58,102 +103,318 @@ class ScrapeAgent:
     
     # ===== STEP 2: Navigation & Retrieval =====
     
-    async def run_navigation(self) -> str:
-        """Step 2: Navigate to URL and execute interactions."""
+    async def run_navigation(self) -> ParsedDocument | ExtractedPage:
+        """Step 2: Navigate to URL, execute interactions and retrieve the parsed HTML."""
         print(f"[Agent] Step 2: Navigating to {self.config.url}")
-        await self._call_with_retry(lambda: self.client.navigate(str(self.config.url)))
 
-        if self.config.interactions:
+        if self.config.interactions and self._static:
+            print(f"[Agent] ⚠ Fetch mode static: {len(self.config.interactions)} interaction(s) skipped without the browser")
+        elif self.config.interactions:
             print(f"[Agent] Running {len(self.config.interactions)} interactions(s)...")
-            await self._run_interactions()
         else:
             print("[Agent] No interactions defined")
         
-        print("[Agent] Fetching HTML...")
-        html = await self._call_with_retry(lambda: self.client.html())
-        print(f"[Agent] HTML retrieved: {len(html)} chars")
-        return html
+        doc = await self._load_page(self.client, str(self.config.url))
+        print(f"[Agent] HTML retrieved: {doc.html_length if isinstance(doc, ExtractedPage) else len(doc.html)} chars")
+        return doc
 
-    async def _run_interactions(self):
-        """Execute user-defined interactions (click, wait, scroll)."""
+    def _interaction_calls(self, item_selector: str | None = None) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        User-defined interactions (click, wait, wait_for, scroll) as MCP tool calls.
+        item_selector is the planned item selector once known: wait_for interactions without
+        their own selector wait for it, and with options.wait_for_items the fixed 'wait' sleeps
+        before the first click/scroll are dropped since navigation already waited for the items.
+        """
+        opts = self.config.options
+        timeout = opts.wait_timeout if opts else 5000
+        skip_leading_waits = bool(item_selector and opts and opts.wait_for_items)
+        calls: List[Tuple[str, Dict[str, Any]]] = []
         for interaction in self.config.interactions:
             t = interaction.type.lower()
             print(f"[Agent] -> {t}")
 
             if t == "click" and interaction.selector:
-                await self._handle_click(interaction.selector)
+                calls.append(("click", {"selector": interaction.selector}))
             elif t == "wait" and interaction.duration:
-                await self._handle_wait(interaction.duration)
+                if skip_leading_waits:
+                    continue
+                calls.append(("wait", {"duration_ms": interaction.duration}))
+            elif t == "wait_for":
+                calls.append(("wait_for", {
+                    "selector": interaction.selector or item_selector,
+                    "network_idle": interaction.network_idle,
+                    "timeout_ms": interaction.duration if interaction.duration is not None else timeout,
+                }))
             elif t == "scroll":
-                await self._handle_scroll(interaction.direction or "bottom")
+                calls.append(("scroll", {"direction": interaction.direction or "bottom"}))
             else:
                 print(f"[Agent] ⚠ Unknown interaction: {interaction}")
-    
-    async def _handle_click(self, selector: str):
-        if self._should_retry():
-            return await retry_async(
-                lambda: self.client.click(selector=selector),
-                retries=1,
-                base_delay=0.3
+            
+            if t in ("click", "scroll"):
+                skip_leading_waits = False
+        return calls
+
+    def _navigate_params(self, url: str, item_selector: str | None = None) -> Dict[str, Any]:
+        """navigate call arguments, waits for the item selector when options.wait_for_items is set."""
+        opts = self.config.options
+        params: Dict[str, Any] = {"url": url}
+        if opts:
+            params["wait_until"] = opts.wait_until.value
+            if opts.wait_for_items and item_selector:
+                params["wait_for_selector"] = item_selector
+                params["wait_timeout_ms"] = opts.wait_timeout
+        return params
+
+    async def _load_page(self, client: MCPClient, url: str, selector_plan: SelectorPlan | None = None) -> ParsedDocument | BrowserExtraction | ExtractedPage:
+        """
+        Navigate client's session to url, replay interactions and return the parsed page,
+        all in one MCP batch round trip. With options.stream_html the HTML is fetched in a second
+        request as a compressed stream and parsed while it arrives. When a selector_plan is given
+        and options.extraction is 'browser' the plan runs in the page instead and only the
+        extracted values come back. Navigation waits for the plan's item selector with
+        options.wait_for_items. The final URL (after redirects) is kept for resolving
+        relative next links. With a CPU pool or the page cache the page comes back already extracted, see _parse.
+        """
+        if self._static:
+            return await self._load_static(client, url, selector_plan)
+        self.fetch_stats["browser"] += 1
+        
+        opts = self.config.options
+        in_browser = selector_plan is not None and opts is not None and opts.extraction == ExtractionMode.BROWSER
+        stream = bool(opts and opts.stream_html) and not in_browser
+        # The page cache needs the whole markup to hash before anything is parsed
+        cached = selector_plan is not None and self.page_cache is not None
+        blocking = self._blocking_params()
+
+        calls = []
+        if blocking:
+            calls.append(("block_resources", blocking))
+        item_selector = selector_plan.item_selector if selector_plan else None
+        calls.append(("navigate", self._navigate_params(url, item_selector)))
+        calls.extend(self._interaction_calls(item_selector))
+        if in_browser:
+            calls.append(("extract", {**selector_plan.to_dict(), "next_link": True}))
+        elif not stream:
+            calls.append(("html", {}))
+        if blocking:
+            calls.append(("resource_stats", {"reset": True}))
+        calls.append(("current_url", {}))
+
+        results = dict(zip((tool for tool, _ in calls), await self._call_with_retry(lambda: client.call_batch(calls), url=url)))
+        if client is self.client:
+            self._current_url = results["current_url"].get("url", "") or url
+        if blocking:
+            self._merge_resource_stats(results["resource_stats"])
+
+        if in_browser:
+            return BrowserExtraction.from_tool_data(results["extract"], selector_plan)
+        if stream and self.cpu_pool is None and not cached:
+            return await self._call_with_retry(
+                lambda: ParsedDocument.from_chunks(client.iter_html(), backend=self._parser_backend()), url=url
             )
-        await self.client.click(selector=selector)
+        if stream:
+            # The worker and the page cache take the whole markup, the stream still saves the JSON encoding on the wire
+            html = await self._call_with_retry(lambda: self._read_html_stream(client), url=url)
+        else:
+            html = MCPClient.markup_of(results["html"])
+        return await self._parse(html, selector_plan, url)
+    
+    @staticmethod
+    async def _read_html_stream(client: MCPClient) -> str:
+        return b"".join([chunk async for chunk in client.iter_html()]).decode("utf-8", errors="replace")
     
-    async def _handle_wait(self, duration_ms: int):
-        sec = duration_ms / 1000.0
-        print(f"[Agent] Waiting for {sec:.1f} seconds...")
-        await asyncio.sleep(sec)
+    async def _parse(self, html: str, selector_plan: SelectorPlan | None, url: str | None = None) -> ParsedDocument | ExtractedPage:
+        """
+        Parse fetched HTML in the event loop, or with a CPU pool parse and extract it in a worker process.
+        Page 1 (no plan yet) is planned in the worker as well, unless the plan cache needs its parsed tree.
+        With the page cache, pages extracted before from the same HTML and plan come back from the cache,
+        others are extracted right away and stored.
+        """
+        if self.page_cache is not None and selector_plan is not None and url and self.schema_analyser is not None:
+            fields = self.schema_analyser.item_fields
+            key = self.page_cache.key(url, PageCache.html_hash(html), selector_plan, fields)
+            page = self.page_cache.load(key)
+            if page is None:
+                if self.cpu_pool is not None:
+                    page = await self.cpu_pool.extract(html, self._parser_backend(), selector_plan, fields)
+                else:
+                    doc = ParsedDocument(html, backend=self._parser_backend())
+                    items, quality_info = self._run_extractor(doc, selector_plan)
+                    page = ExtractedPage(items, quality_info, find_next_link(doc), len(html))
+                self.page_cache.store(key, url, page)
+            return page
+        if self.cpu_pool is not None and self.schema_analyser is not None:
+            fields = self.schema_analyser.item_fields
+            if selector_plan is not None:
+                return await self.cpu_pool.extract(html, self._parser_backend(), selector_plan, fields)
+            if self.plan_cache is None:
+                return await self.cpu_pool.plan(html, self._parser_backend(), self.schema_analyser.collection_name, fields)
+        return ParsedDocument(html, backend=self._parser_backend())
+    
+    async def _load_static(self, client: MCPClient | None, url: str, selector_plan: SelectorPlan | None = None,
+                           probe: bool = False) -> ParsedDocument | ExtractedPage:
+        """
+        Fetch url over plain HTTP, interactions can not run without the browser.
+        With the page cache, pages that have a plan are revalidated: the ETag / Last-Modified of the
+        last response go along and a 304 Not Modified is answered with the page cached for it.
+        """
+        if self.static_fetcher is None:
+            self.static_fetcher = StaticFetcher()
+        revalidate = self.page_cache is not None and selector_plan is not None and self.schema_analyser is not None
+        validators = self.page_cache.validators(url, selector_plan, self.schema_analyser.item_fields) if revalidate else None
+        
+        final_url, html, fresh = await self._call_with_retry(lambda: self.static_fetcher.fetch(url, validators), url=url)
+        page = None
+        if html is None:
+            page = self.page_cache.revalidated(url, validators, selector_plan, self.schema_analyser.item_fields)
+            if page is None:
+                # The cached page went away since the request was sent
+                final_url, html, fresh = await self._call_with_retry(lambda: self.static_fetcher.fetch(url), url=url)
+        if client is self.client:
+            self._current_url = final_url
+        self.fetch_stats["probes" if probe else "static"] += 1
+        
+        if page is None:
+            page = await self._parse(html, selector_plan, url)
+            if revalidate:
+                self.page_cache.store_validators(url, fresh, PageCache.html_hash(html))
+        page.fetched_by = "static"
+        return page
     
-    async def _handle_scroll(self, direction: str):
+    async def _detect_static(self, first_doc: ParsedDocument | ExtractedPage, selector_plan: SelectorPlan, items: List[Dict[str, Any]]) -> None:
+        """
+        fetch_mode 'auto': fetch page 1 again without the browser and switch pages 2..N to plain HTTP
+        when it yields at least as many items at the same completion rate as the rendered page.
+        """
+        if self.config.interactions:
+            print("[Agent] Fetch mode auto: interactions configured, staying on the browser")
+            return
+        
         try:
-            await self._call_with_retry(lambda: self.client.scroll(direction))
-        except AttributeError:
-            print("[Agent] ⚠ Scroll not implemented")
+            static_doc = await self._load_static(None, self._current_url or str(self.config.url), selector_plan, probe=True)
+        except Exception as e:
+            print(f"[Agent] Fetch mode auto: static fetch failed ({e}), staying on the browser")
+            return
+        
+        static_items, static_quality = self._run_extractor(static_doc, selector_plan)
+        static_rate = static_quality["quality"].completion_rate
+        
+        self._static = len(static_items) >= len(items) > 0 and static_rate >= (self._baseline_rate or 0.0)
+        print(f"[Agent] Fetch mode auto: {len(static_items)}/{len(items)} items without JavaScript -> "
+              f"{'static HTTP' if self._static else 'browser'} for the next pages")
+    
+    def _blocking_params(self) -> Dict[str, Any] | None:
+        """block_resources call for the job's options, None when nothing is blocked."""
+        opts = self.config.options
+        if not opts or not (opts.block_resources or opts.block_urls):
+            return None
+        return {"resource_types": [t.value for t in opts.block_resources], "url_patterns": list(opts.block_urls)}
+    
+    def _merge_resource_stats(self, page_stats: Dict[str, Any]) -> None:
+        for key, value in page_stats.items():
+            if isinstance(value, dict):
+                total = self.resource_stats.setdefault(key, {})
+                for sub, count in value.items():
+                    total[sub] = total.get(sub, 0) + count
+            else:
+                self.resource_stats[key] = self.resource_stats.get(key, 0) + value
     
     # ===== STEP 3: Selector Identification =====
     
-    def identify_selectors(self, html: str) -> SelectorPlanner:
+    def identify_selectors(self, html: str | ParsedDocument | ExtractedPage) -> SelectorPlan:
         """Step 3: Identify CSS selectors for each field."""
         print(f"[Agent] STEP 3: IDentifying selectors...")
         
         if not self.schema_analyser:
             raise RuntimeError("Schema not analyzed. Call analyze_schema() first.")
         
-        planner = SelectorPlanner(
-            html=html,
-            collection_name=self.schema_analyser.collection_name,
-            expected_fields=self.schema_analyser.item_fields
-        )
-        plan = planner.build_plan()
+        if isinstance(html, ExtractedPage) and html.plan is not None:
+            # Already planned by the CPU pool worker that parsed the page
+            plan = html.plan
+        else:
+            planner = SelectorPlanner(
+                html=html,
+                collection_name=self.schema_analyser.collection_name,
+                expected_fields=self.schema_analyser.item_fields,
+                backend=self._parser_backend()
+            )
+            plan = planner.build_plan()
         
         print(f"[Agent] ✓ Item selector: {plan.item_selector or 'None (document root)'}")
         print(f"[Agent] ✓ Field selectors identified for {len(plan.field_selectors)} fields")
         
         return plan
     
+    def _cached_or_new_plan(self, doc: ParsedDocument) -> SelectorPlan:
+        """Reuse a learned plan for this host/schema/page structure, plan from scratch otherwise."""
+        if self.plan_cache and self.schema_analyser:
+            self._plan_key = self.plan_cache.key(str(self.config.url), self.schema_analyser.item_fields, doc)
+            cached = self.plan_cache.load(self._plan_key)
+            if cached is not None:
+                print(f"[Agent] STEP 3: Using cached selector plan ({self._plan_key})")
+                self._plan_from_cache = True
+                return cached
+        
+        return self.identify_selectors(doc)
+    
+    def _update_plan_cache(self, completion_rate: float) -> None:
+        """Store the learned plan after a good run, drop a cached one whose quality dropped."""
+        if not self.plan_cache or not self._plan_key or not self.selector_plan:
+            return
+        
+        if self._plan_from_cache:
+            if not self.plan_cache.validate(self._plan_key, completion_rate):
+                print(f"[Agent] ⚠ Completion rate dropped to {completion_rate:.1%}, cached plan invalidated")
+            return
+        
+        if completion_rate > 0:
+            # A plan refined in this run is the one pages 2..N were extracted with, stored as is so the
+            # next run keys its cached pages with the same plan. Otherwise it is refined with all hits
+            plan = self.selector_plan if self._plan_refined else self.selector_plan.refined(self.selector_hits)
+            self.plan_cache.store(self._plan_key, plan, completion_rate)
+            print(f"[Agent] ✓ Selector plan cached ({self._plan_key})")
+    
+    def _print_selector_hits(self) -> None:
+        print("[Agent] Selector hits:")
+        for field, hits in self.selector_hits.items():
+            summary = ", ".join(f"{sel} x{count}" for sel, count in sorted(hits.items(), key=lambda kv: -kv[1]))
+            print(f"[Agent]   {field}: {summary or 'no hits'}")
+    
+    def _merge_selector_hits(self, page_hits: Dict[str, Dict[str, int]]) -> None:
+        for field, hits in page_hits.items():
+            total = self.selector_hits.setdefault(field, {})
+            for sel, count in hits.items():
+                total[sel] = total.get(sel, 0) + count
+    
     # ===== STEP 4: Extraction & Validation =====
     
-    def extract_data(self, html: str, selector_plan) -> tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    def extract_data(self, html: str | ParsedDocument | BrowserExtraction | ExtractedPage, selector_plan) -> tuple[List[Dict[str, Any]], Dict[str, Any]]:
         """Step 4: Extract and validate data."""
         print(f"[Agent] STEP 4: Extracting data...")
         
         if not self.schema_analyser:
             raise RuntimeError("Schema not analyzed.")
         
-        extractor = Extractor(
-            html=html,
-            selector_plan=selector_plan,
-            field_types=self.schema_analyser.item_fields
-        )
-        items, quality_info = extractor.run()
+        items, quality_info = self._run_extractor(html, selector_plan)
         
         print(f"[Agent] ✓ Extracted {len(items)} items")
-        if quality_info["missing_items"]:
-            missing_count = sum(1 for m in quality_info["missing_items"] if m)
-            if missing_count > 0:
-                print(f"[Agent] ⚠ {missing_count} items have missing fields")
+        missing_count = quality_info["quality"].incomplete_items
+        if missing_count > 0:
+            print(f"[Agent] ⚠ {missing_count} items have missing fields")
         
         return items, quality_info
     
+    def _run_extractor(self, html: str | ParsedDocument | BrowserExtraction | ExtractedPage, selector_plan) -> tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Items and quality info of a page, pages from the CPU pool were extracted by the worker already."""
+        if isinstance(html, ExtractedPage):
+            return html.items, html.quality_info
+        return Extractor(
+            html=html,
+            selector_plan=selector_plan,
+            field_types=self.schema_analyser.item_fields,
+            backend=self._parser_backend()
+        ).run()
+    
     # ===== STEP 5: Pagination =====
     
     async def run_with_pagination(self) -> tuple[List[Dict[str, Any]], Dict[str, Any]]:
@@ -167,64 +428,215 @@ class ScrapeAgent:
         
         # Step 2: Navigate to first page
         all_items: List[Dict[str, Any]] = []
-        all_missing: List[List[str]] = []
         
-        first_html = await self.run_navigation()
+        # Parsed once, the same tree feeds planning, extraction and next link lookup
+        first_doc = await self.run_navigation()
         
         # Step 3: Identify selectors
-        selector_plan = self.identify_selectors(first_html)
+        selector_plan = self._cached_or_new_plan(first_doc)
+        self.selector_plan = selector_plan
         
         # Step 4: Extract data
-        items, quality_info = self.extract_data(first_html, selector_plan)
-        all_items.extend(items)
-        all_missing.extend(quality_info["missing_items"])
+        items, quality_info = self.extract_data(first_doc, selector_plan)
+        if not items and first_doc.fetched_by == "static":
+            # Page 1 needs JavaScript after all, render it and plan again
+            print("[Agent] ⚠ No items without JavaScript, falling back to the browser")
+            self._static = False
+            self.fetch_stats["fallbacks"] += 1
+            self._plan_key, self._plan_from_cache = None, False
+            first_doc = await self.run_navigation()
+            selector_plan = self._cached_or_new_plan(first_doc)
+            self.selector_plan = selector_plan
+            items, quality_info = self.extract_data(first_doc, selector_plan)
+        self._baseline_rate = quality_info["quality"].completion_rate
+        self._keep(items, quality_info["quality"], 1, all_items)
+        self._merge_selector_hits(quality_info["selector_hits"])
         
         # Step 5: Pagination (if enabled)
         opts = self.config.options
         if opts and opts.pagination:
             print(f"[Agent] STEP 5: Pagination enabled (max {opts.max_pages} pages)")
             
+            if opts.refine_plan and not self._plan_from_cache:
+                # Pages 2..N only try the candidates that won on page 1, the rest become fallbacks.
+                # A cached plan is always stored refined and is used as is
+                selector_plan = selector_plan.refined(self.selector_hits)
+                self._plan_refined = True
+                self.selector_plan = selector_plan
+                kept = sum(len(sels) for sels in selector_plan.field_selectors.values())
+                print(f"[Agent] ✓ Plan refined to {kept} primary selectors")
+            
             max_pages = opts.max_pages or 1
-            remaining = max(0, max_pages - 1)
-            page_num = 1
-            last_html = first_html
-
-            while remaining > 0:
-                print(f"[Agent] Fetching page {page_num + 1}...")
-                
-                next_href = self._find_next_link(last_html)
-                if not next_href:
-                    print("[Agent] ⚠ No next link found, stopping pagination")
-                    break
-
-                current = await self._call_with_retry(lambda: self.client.current_url())
-                next_url = urljoin(current, next_href)
-
-                await self._call_with_retry(lambda: self.client.navigate(next_url))
-                if self.config.interactions:
-                    await self._run_interactions()
-                
-                last_html = await self._call_with_retry(lambda: self.client.html())
-                
-                # Extract from this page
-                page_items, page_quality = self.extract_data(last_html, selector_plan)
-                all_items.extend(page_items)
-                all_missing.extend(page_quality["missing_items"])
-                
-                print(f"[Agent] ✓ Page {page_num + 1}: +{len(page_items)} items")
-                
-                remaining -= 1
-                page_num += 1
+            if max_pages > 1 and opts.fetch_mode == FetchMode.AUTO:
+                await self._detect_static(first_doc, selector_plan, items)
+            if max_pages > 1:
+                page_urls = await self._predict_page_urls(first_doc, max_pages) if opts.prefetch_pages > 0 else None
+                if page_urls:
+                    await self._paginate_concurrently(page_urls, selector_plan, all_items)
+                else:
+                    await self._paginate_sequentially(first_doc, max_pages, selector_plan, all_items)
             
-            print(f"[Agent] ✓ Pagination complete: {len(all_items)} items total")
+            print(f"[Agent] ✓ Pagination complete: {self.quality.total_items} items total")
+        
+        self._print_selector_hits()
+        if self.resource_stats:
+            print(f"[Agent] Resources: {self.resource_stats.get('blocked_requests', 0)} requests blocked, "
+                  f"{self.resource_stats.get('loaded_requests', 0)} loaded ({self.resource_stats.get('loaded_bytes', 0)} bytes)")
         
         final_quality = {
-            "total_items": len(all_items),
-            "missing_items": all_missing
+            "total_items": self.quality.total_items,
+            "quality": self.quality,
+            "selector_hits": self.selector_hits
         }
         
         return all_items, final_quality
     
+    def _collect_page(self, doc: ParsedDocument | BrowserExtraction | ExtractedPage, selector_plan: SelectorPlan, page_num: int,
+                      all_items: List[Dict[str, Any]]) -> int | None:
+        """
+        Extract one paginated page into the running results, returns its item count.
+        Returns None without collecting anything when a statically fetched page extracts clearly
+        worse than page 1, the caller then loads it through the browser, which is used from now on.
+        """
+        page_items, page_quality = self.extract_data(doc, selector_plan)
+        if isinstance(doc, (ParsedDocument, ExtractedPage)) and doc.fetched_by == "static":
+            rate = page_quality["quality"].completion_rate
+            if not page_items or rate < (self._baseline_rate or 0.0) - STATIC_QUALITY_TOLERANCE:
+                print(f"[Agent] ⚠ Page {page_num} extracts worse without JavaScript ({len(page_items)} items, "
+                      f"{rate:.0%} complete), switching to the browser")
+                self._static = False
+                self.fetch_stats["fallbacks"] += 1
+                return None
+        
+        self._keep(page_items, page_quality["quality"], page_num, all_items)
+        self._merge_selector_hits(page_quality["selector_hits"])
+        
+        print(f"[Agent] ✓ Page {page_num}: +{len(page_items)} items")
+        return len(page_items)
+    
+    def _keep(self, items: List[Dict[str, Any]], page_quality: QualityAccumulator, page_num: int,
+              all_items: List[Dict[str, Any]]) -> None:
+        """Hand one page of items to the result writer, without one they are kept for the final result."""
+        self.quality.merge(page_quality, page=page_num)
+        if self.writer is not None:
+            self.writer.write_page(items)
+        else:
+            all_items.extend(items)
+    
+    async def _paginate_sequentially(self, first_doc: ParsedDocument | ExtractedPage, max_pages: int, selector_plan: SelectorPlan,
+                                     all_items: List[Dict[str, Any]]) -> None:
+        """Follow next links one page at a time."""
+        remaining = max(0, max_pages - 1)
+        page_num = 1
+        last_doc = first_doc
+
+        while remaining > 0:
+            print(f"[Agent] Fetching page {page_num + 1}...")
+            
+            next_href = self._find_next_link(last_doc)
+            if not next_href:
+                print("[Agent] ⚠ No next link found, stopping pagination")
+                break
+
+            next_url = urljoin(self._current_url, next_href)
+            last_doc = await self._load_page(self.client, next_url, selector_plan)
+            
+            # Extract from this page
+            if self._collect_page(last_doc, selector_plan, page_num + 1, all_items) is None:
+                last_doc = await self._load_page(self.client, next_url, selector_plan)
+                self._collect_page(last_doc, selector_plan, page_num + 1, all_items)
+            
+            remaining -= 1
+            page_num += 1
+    
+    async def _predict_page_urls(self, first_doc: ParsedDocument | ExtractedPage, max_pages: int) -> List[str] | None:
+        """
+        URLs of pages 2..max_pages when the next link carries the page number,
+        e.g. /page2.html or ?page=2. None when the sequence can not be predicted.
+        """
+        next_href = self._find_next_link(first_doc)
+        if not next_href:
+            return None
+        
+        current = self._current_url
+        next_url = urljoin(current, next_href)
+        
+        # The rightmost "2" in the next URL that is not already in the current URL is the page counter
+        for match in reversed(list(re.finditer(r"\d+", next_url))):
+            if int(match.group()) != 2 or next_url[:match.end()] == current[:match.end()]:
+                continue
+            prefix, suffix = next_url[:match.start()], next_url[match.end():]
+            return [f"{prefix}{n}{suffix}" for n in range(2, max_pages + 1)]
+        
+        return None
+    
+    async def _paginate_concurrently(self, page_urls: List[str], selector_plan: SelectorPlan,
+                                     all_items: List[Dict[str, Any]]) -> None:
+        """
+        Fetch predicted pages over separate MCP sessions, at most options.prefetch_pages at a time,
+        while earlier pages are extracted. Pages are extracted in order, the first page that fails
+        to load or yields no items ends pagination.
+        """
+        concurrency = min(self.config.options.prefetch_pages, len(page_urls))
+        sessions: asyncio.Queue[MCPClient] = asyncio.Queue()
+        opened: List[MCPClient] = []
+        if self._static:
+            # Plain HTTP pages need no browser sessions, the slots only bound concurrency
+            for _ in range(concurrency):
+                sessions.put_nowait(self.client)
+        else:
+            try:
+                for _ in range(concurrency):
+                    opened.append(await self.client.open_session())
+            except Exception as e:
+                # Older servers without session support -> fetch the predicted pages one by one on our own session
+                print(f"[Agent] ⚠ Could not open MCP sessions ({e}), fetching pages sequentially")
+                for session in opened:
+                    await session.close_session()
+                opened = []
+            
+            for session in opened or [self.client]:
+                sessions.put_nowait(session)
+        print(f"[Agent] Prefetching {len(page_urls)} pages over {sessions.qsize()} {'HTTP slot' if self._static else 'session'}(s)")
+        
+        static = self._static
+        
+        async def fetch(url: str) -> ParsedDocument | BrowserExtraction | ExtractedPage:
+            session = await sessions.get()
+            try:
+                if static:
+                    # Stays on plain HTTP even after a fallback switched the agent to the browser, the
+                    # slots are not MCP sessions. Pages that then extract worse are reloaded through the
+                    # browser one at a time below, never concurrently on the agent's own session
+                    return await self._load_static(None, url, selector_plan)
+                return await self._load_page(session, url, selector_plan)
+            finally:
+                sessions.put_nowait(session)
+        
+        # Tasks queue on the session pool in page order, so at most `concurrency` pages are in flight
+        tasks = [asyncio.create_task(fetch(url)) for url in page_urls]
+        try:
+            for page_num, (url, task) in enumerate(zip(page_urls, tasks), start=2):
+                try:
+                    doc = await task
+                except Exception as e:
+                    print(f"[Agent] ⚠ Page {page_num} failed ({e}), stopping pagination")
+                    break
+                
+                count = self._collect_page(doc, selector_plan, page_num, all_items)
+                if count is None:
+                    doc = await self._load_page(self.client, url, selector_plan)
+                    count = self._collect_page(doc, selector_plan, page_num, all_items)
+                if count == 0:
+                    print(f"[Agent] ⚠ Page {page_num} has no items, stopping pagination")
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for session in opened:
+                await session.close_session()
+    
     # ===== STEP 6: Result Generation & Formatting =====
     
     async def run_complete(self) -> Dict[str, Any]:
@@ -241,18 +653,31 @@ class ScrapeAgent:
             if not self.formatter:
                 self.analyze_schema()
             
+            opts = self.config.options
+            if opts and opts.output_path:
+                self.writer = open_writer(opts.output_format.value, opts.output_path, self.formatter.collection_name)
+            
             # Run full pipeline
             all_items, quality_info = await self.run_with_pagination()
             
             # Generate metadata
-            metadata = self._generate_metadata(all_items)
+            metadata = self._generate_metadata(self.quality.total_items)
             
             # Format result - formatter is guaranteed to exist
-            result = self.formatter.format_success(
-                items=all_items,
-                metadata=metadata,
-                missing_items=quality_info["missing_items"]
-            )
+            if self.writer is not None:
+                metadata["output"] = {"path": str(self.writer.file_path), "format": opts.output_format.value}
+                result = self.formatter.format_streamed(self.writer, metadata, quality_info["quality"],
+                                                        selector_hits=quality_info["selector_hits"])
+                self.writer = None
+            else:
+                result = self.formatter.format_success(
+                    items=all_items,
+                    metadata=metadata,
+                    quality=quality_info["quality"],
+                    selector_hits=quality_info["selector_hits"]
+                )
+            
+            self._update_plan_cache(result["quality_report"]["completion_rate"])
             
             print(f"\n[Agent] STEP 6: Result formatted")
             print(f"[Agent] ✓ Status: {result['status']}")
@@ -271,6 +696,12 @@ class ScrapeAgent:
             if not self.formatter:
                 self.analyze_schema()
             
+            # Items written so far stay readable, the file ends with the error
+            if self.writer is not None:
+                self.writer.close({"status": "error", "error": str(e), "details": type(e).__name__,
+                                   "metadata": self._generate_metadata(self.quality.total_items)})
+                self.writer = None
+            
             if self.formatter:
                 return self.formatter.format_error(
                     error_message=str(e),
@@ -285,39 +716,39 @@ class ScrapeAgent:
                 "data": None,
                 "quality_report": None
             }
+        
+        finally:
+            if self.static_fetcher is not None:
+                await self.static_fetcher.stop()
+            if self._owns_cpu_pool:
+                await asyncio.to_thread(self.cpu_pool.shutdown)
     
-    def _generate_metadata(self, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _generate_metadata(self, num_results: int) -> Dict[str, Any]:
         """Generate metadata for the extraction."""
         metadata = {
             "extraction_date": datetime.utcnow().isoformat() + "Z",
-            "num_results": len(items),
+            "num_results": num_results,
             "source_url": str(self.config.url)
         }
+        if self.resource_stats:
+            metadata["resources"] = self.resource_stats
+        opts = self.config.options
+        if opts and opts.fetch_mode != FetchMode.BROWSER:
+            metadata["fetch"] = self.fetch_stats
+        if self.page_cache is not None:
+            metadata["page_cache"] = dict(self.page_cache.stats)
+        if self.retry_budget.spent or self.breaker.open_hosts():
+            metadata["retries"] = {
+                "spent": self.retry_budget.spent,
+                "budget": self.retry_budget.max_retries,
+                "open_circuits": self.breaker.open_hosts(),
+            }
         return metadata
     
-    def _find_next_link(self, html: str) -> str | None:
+    def _find_next_link(self, html: str | ParsedDocument | BrowserExtraction | ExtractedPage) -> str | None:
         """Find next page link using multiple strategies."""
-        soup = BeautifulSoup(html, "lxml")
-        
-        # Strategy 1: rel='next'
-        a = soup.select_one("a[rel='next']")
-        if a and a.get("href"):
-            return a["href"]
-        
-        # Strategy 2: aria-label containing 'next'
-        a = soup.select_one("a[aria-label*='next' i]")
-        if a and a.get("href"):
-            return a["href"]
-        
-        # Strategy 3: Text matching 'next'
-        for cand in soup.select("a[href]"):
-            txt = cand.get_text(strip=True).lower()
-            if txt in {"next", "next page"} or txt.endswith("»") or "next" in txt:
-                return cand["href"]
-        
-        # Strategy 4: Common pagination patterns
-        a = soup.select_one("li.next a[href], .pagination a.next[href], .pager a.next[href]")
-        if a and a.get("href"):
-            return a["href"]
-        
-        return None
\ No newline at end of file
+        if isinstance(html, (BrowserExtraction, ExtractedPage)):
+            # Found by the extract tool with the same strategies
+            return html.next_href
+        
+        return find_next_link(ParsedDocument.of(html, backend=self._parser_backend()))
@@ -0,0 +1,181 @@
+"""
+Batch runner for many ScrapeConfigs.
+
+Reads one ScrapeConfig per line from a JSONL file, runs them with a bounded
+pool of asyncio workers against one or more MCP servers and streams one JSON
+result line per job as soon as it finishes.
+
+Run this with:
+    python -m src.agent.batch_runner configs.jsonl --server http://127.0.0.1:8000 --workers 8
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, IO, List, Optional
+
+from pydantic import ValidationError
+from src.agent.agent import ScrapeAgent
+from src.agent.config_models import ScrapeConfig
+from src.agent.cpu_pool import CpuPool
+from src.agent.mcp_client import MCPClient
+from src.agent.retry import CircuitBreaker
+
+# One line of the input file, parsed or with the reason it could not be
+class BatchJob:
+    def __init__(self, line_no: int, job_id: str, config: Optional[ScrapeConfig], error: Optional[str] = None):
+        self.line_no = line_no
+        self.job_id = job_id
+        self.config = config
+        self.error = error
+
+# Running per batch counters, printed as the summary at the end
+class BatchStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations: List[float] = []
+        self.succeeded = 0
+        self.failed = 0
+
+    def record(self, ok: bool, duration: float) -> None:
+        self.durations.append(duration)
+        if ok:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+
+    def summary(self) -> Dict[str, Any]:
+        durations = sorted(self.durations)
+        total = len(durations)
+        return {
+            "jobs": total,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "wall_time_s": round(time.perf_counter() - self.started, 3),
+            "mean_job_s": round(sum(durations) / total, 3) if total else 0.0,
+            "p95_job_s": round(durations[min(total - 1, int(total * 0.95))], 3) if total else 0.0,
+            "max_job_s": round(durations[-1], 3) if total else 0.0,
+        }
+
+def load_jobs(path: str) -> List[BatchJob]:
+    jobs: List[BatchJob] = []
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            job_id = str(line_no)
+            try:
+                raw = json.loads(line)
+                job_id = str(raw.pop("job_id", line_no))
+                jobs.append(BatchJob(line_no, job_id, ScrapeConfig(**raw)))
+            except (ValueError, ValidationError, TypeError, AttributeError) as e:
+                jobs.append(BatchJob(line_no, job_id, None, error=f"Invalid config: {e}"))
+    return jobs
+
+"""
+Executes BatchJobs with `workers` concurrent ScrapeAgents.
+- One MCPClient (one HTTP connection pool) for all servers, sessions are leased from them round robin
+- Every job leases its own browser session so parallel agents never share a page
+- Jobs share one circuit breaker, a site that keeps failing is backed off by all workers at once
+- With cpu_workers, pages of all jobs are parsed and extracted in one shared process pool
+- Results are written to `out` as JSON lines in completion order
+"""
+class BatchRunner:
+    def __init__(self, servers: List[str], workers: int = 4, http2: bool = False, cpu_workers: int = 0):
+        self.servers = servers or ["http://127.0.0.1:8000"]
+        self.workers = max(1, workers)
+        self.http2 = http2
+        self.stats = BatchStats()
+        self.breaker = CircuitBreaker()
+        self.cpu_pool = CpuPool(cpu_workers) if cpu_workers > 0 else None
+        self._client: Optional[MCPClient] = None
+
+    async def run(self, jobs: List[BatchJob], out: IO[str]) -> Dict[str, Any]:
+        # Every worker keeps a connection per server busy, plus slack for concurrent pagination sessions
+        self._client = MCPClient(base_url=self.servers, http2=self.http2,
+                                 max_connections=max(100, self.workers * 4),
+                                 max_keepalive_connections=max(20, self.workers * 2))
+        await self._client.start()
+
+        queue: asyncio.Queue[BatchJob] = asyncio.Queue()
+        for job in jobs:
+            queue.put_nowait(job)
+
+        async def worker() -> None:
+            while True:
+                try:
+                    job = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                record = await self._run_job(job, self._client)
+                out.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                out.flush()
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(min(self.workers, len(jobs)) or 1)))
+        finally:
+            await self._client.stop()
+            if self.cpu_pool is not None:
+                await asyncio.to_thread(self.cpu_pool.shutdown)
+
+        return self.stats.summary()
+
+    async def _run_job(self, job: BatchJob, client: MCPClient) -> Dict[str, Any]:
+        start = time.perf_counter()
+        record: Dict[str, Any] = {"job_id": job.job_id, "line": job.line_no, "server": None}
+
+        if job.config is None:
+            result: Dict[str, Any] = {"status": "error", "error": job.error, "details": "ValidationError", "data": None, "quality_report": None}
+        else:
+            session: Optional[MCPClient] = None
+            try:
+                session = await client.open_session()
+                record["server"] = session.base_url
+                result = await ScrapeAgent(session, job.config, breaker=self.breaker, cpu_pool=self.cpu_pool).run_complete()
+            except Exception as e:
+                result = {"status": "error", "error": str(e), "details": type(e).__name__, "data": None, "quality_report": None}
+            finally:
+                if session is not None:
+                    try:
+                        await session.close_session()
+                    except Exception:
+                        pass
+
+        duration = time.perf_counter() - start
+        self.stats.record(result.get("status") == "success", duration)
+        record.update({"status": result.get("status"), "duration_s": round(duration, 3), "result": result})
+        return record
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run many scrape configs against one or more MCP servers")
+    parser.add_argument("configs", help="JSONL file, one ScrapeConfig per line (optional 'job_id' key)")
+    parser.add_argument("--server", action="append", dest="servers", help="MCP server base URL, repeat for several servers")
+    parser.add_argument("--workers", type=int, default=4, help="Number of concurrent jobs")
+    parser.add_argument("--http2", action="store_true", help="Talk HTTP/2 to the servers (needs the h2 package)")
+    parser.add_argument("--cpu-workers", type=int, default=0, help="Worker processes shared by all jobs for parsing and extraction, 0 = in the event loop")
+    parser.add_argument("--output", default="artifacts/json_dumps/batch_results.jsonl", help="Result JSONL file, '-' for stdout")
+    return parser.parse_args(argv)
+
+async def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    jobs = load_jobs(args.configs)
+    runner = BatchRunner(servers=args.servers or [], workers=args.workers, http2=args.http2, cpu_workers=args.cpu_workers)
+
+    if args.output != "-":
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        summary = await runner.run(jobs, out)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    print(json.dumps({"summary": summary}), file=sys.stderr)
+    return 0 if summary["failed"] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -6,24 +6,71 @@ class InteractionType(str, Enum):
     CLICK = "click"
     SCROLL = "scroll"
     WAIT = "wait"
+    WAIT_FOR = "wait_for"
     EXTRACT = "extract"
 
 class ScrollDirection(str, Enum):
     TOP = "top"
     BOTTOM = "bottom"
 
+# HTML tree the planner and extractor run on
+class ParserBackend(str, Enum):
+    BS4 = "bs4" # BeautifulSoup on top of lxml
+    LXML = "lxml" # Native lxml tree with compiled XPath
+
+# How pages are retrieved
+class FetchMode(str, Enum):
+    BROWSER = "browser" # Always render through the MCP server's browser
+    STATIC = "static" # Plain HTTP, no JavaScript, falls back to the browser when extraction quality drops
+    AUTO = "auto" # Browser for page 1, plain HTTP for pages 2..N when page 1 extracts as well without JavaScript
+
+# Load state navigation waits for before the page counts as loaded
+class WaitUntil(str, Enum):
+    COMMIT = "commit"
+    DOMCONTENTLOADED = "domcontentloaded"
+    LOAD = "load"
+    NETWORKIDLE = "networkidle"
+
+# Where the selector plan runs on pages 2..N
+class ExtractionMode(str, Enum):
+    LOCAL = "local" # HTML is transferred and parsed by the agent
+    BROWSER = "browser" # The plan is evaluated in the page by the MCP extract tool, only values are transferred
+
+# File format of options.output_path
+class OutputFormat(str, Enum):
+    JSON = "json" # The regular result document, items streamed into its collection array
+    NDJSON = "ndjson" # One item per line, a status/metadata/quality_report line at the end
+
+# Browser resource types the MCP server can block per session
+class ResourceType(str, Enum):
+    IMAGE = "image"
+    MEDIA = "media"
+    FONT = "font"
+    STYLESHEET = "stylesheet"
+    SCRIPT = "script"
+    XHR = "xhr"
+    FETCH = "fetch"
+    WEBSOCKET = "websocket"
+    EVENTSOURCE = "eventsource"
+    TEXTTRACK = "texttrack"
+    MANIFEST = "manifest"
+    OTHER = "other"
+
 # User interaction executed by the scraper 
 class Interaction(BaseModel):
     type: InteractionType
     selector: Optional[str] = None
     duration: Optional[int] = Field(default=None, ge=0, description="Ms to wait (only requiered when type=wait)")
     direction: Optional[ScrollDirection] = None
+    network_idle: bool = False # wait_for also resolves when the network goes idle
 
     """
     Rules per interaction type:
     - scroll -> direction is required
     - wait -> duration is required >= 0
     - click/extract -> selector is required
+    - wait_for -> waits for selector (default: the planned item selector) or network idle,
+      duration is the timeout cap in ms (default 5000)
     """
     @model_validator(mode="after")
     def check_required_fields(self):
@@ -42,12 +89,30 @@ class Options(BaseModel):
     pagination: bool = False
     max_pages: int = 1
     retry_failed: bool = True
+    retry_budget: int = Field(default=10, ge=0) # Retries the whole job may spend, on top of each call's first attempt
+    parser_backend: ParserBackend = ParserBackend.BS4
+    prefetch_pages: int = Field(default=0, ge=0) # Predicted next pages fetched concurrently over separate MCP sessions
+    refine_plan: bool = True # After page 1 only the winning candidates are tried first on pages 2..N
+    plan_cache: bool = False # Reuse learned selector plans across runs (artifacts/plan_cache)
+    page_cache: bool = False # Reuse the items of pages whose HTML did not change since an earlier run (artifacts/page_cache)
+    page_cache_mb: int = Field(default=256, ge=1) # Disk space the page cache may use, least recently used pages are evicted
+    stream_html: bool = False # Fetch HTML as a compressed byte stream and parse it while it arrives
+    extraction: ExtractionMode = ExtractionMode.LOCAL
+    block_resources: list[ResourceType] = Field(default_factory=list) # e.g. ["image", "font", "media"], never requested by the browser
+    block_urls: list[str] = Field(default_factory=list) # URL globs or substrings, e.g. ["google-analytics.com", "*://*.doubleclick.net/*"]
+    wait_until: WaitUntil = WaitUntil.DOMCONTENTLOADED # Load state every navigation waits for
+    wait_for_items: bool = False # Once the item selector is known, navigation waits for it and leading 'wait' sleeps are skipped
+    wait_timeout: int = Field(default=5000, ge=0) # Cap in ms for selector / network idle waits
+    fetch_mode: FetchMode = FetchMode.BROWSER
+    output_path: Optional[str] = None # Items are written here page by page and left out of the returned result
+    output_format: OutputFormat = OutputFormat.JSON
+    cpu_workers: int = Field(default=0, ge=0) # Worker processes that parse, plan and extract pages, 0 does it in the event loop
 
 """
 Full config for a scraping job. 
 - url -> start url 
 - schema -> json schema describing extracted data
-- interactions -> ordered steps (click/scroll/wait/extract)
+- interactions -> ordered steps (click/scroll/wait/wait_for/extract)
 - options: pagination, retries, etc
 """
 class ScrapeConfig(BaseModel):
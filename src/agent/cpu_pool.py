@@ -0,0 +1,103 @@
+from __future__ import annotations
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import multiprocessing
+import pickle
+
+from .document import ParsedDocument
+from .extractor import Extractor, find_next_link
+from .plan_cache import plan_fingerprint
+from .select_planner import SelectorPlan, SelectorPlanner
+
+# Plans a worker process keeps, agents of a batch each bring their own
+WORKER_PLAN_CACHE_SIZE = 64
+
+# plan id -> (plan with its compiled selectors, field types), lives in each worker process
+_WORKER_PLANS: Dict[str, Tuple[SelectorPlan, Dict[str, str]]] = {}
+
+"""
+What a worker returns for one page instead of the parsed tree: the extracted items with their
+quality info and the next page link. plan is set when the worker planned the page itself.
+"""
+class ExtractedPage:
+    fetched_by = "browser" # "static" when the HTML came over plain HTTP without the browser
+
+    def __init__(self, items: List[Dict[str, Any]], quality_info: Dict[str, Any], next_href: Optional[str],
+                 html_length: int, plan: Optional[SelectorPlan] = None):
+        self.items = items
+        self.quality_info = quality_info
+        self.next_href = next_href
+        self.html_length = html_length
+        self.plan = plan
+
+# plan_blob is the pickled (plan, field types), only unpickled by a worker that does not hold plan_id yet
+def _extract_page(html: str, backend: str, plan_id: str, plan_blob: bytes) -> ExtractedPage:
+    entry = _WORKER_PLANS.get(plan_id)
+    if entry is None:
+        if len(_WORKER_PLANS) >= WORKER_PLAN_CACHE_SIZE:
+            _WORKER_PLANS.pop(next(iter(_WORKER_PLANS)))
+        entry = _WORKER_PLANS[plan_id] = pickle.loads(plan_blob)
+    plan, field_types = entry
+
+    doc = ParsedDocument(html, backend=backend)
+    items, quality_info = Extractor(doc, plan, field_types, backend=backend).run()
+    return ExtractedPage(items, quality_info, find_next_link(doc), len(html))
+
+def _plan_page(html: str, backend: str, collection_name: Optional[str], field_types: Dict[str, str]) -> ExtractedPage:
+    doc = ParsedDocument(html, backend=backend)
+    plan = SelectorPlanner(doc, collection_name, field_types, backend=backend).build_plan()
+    items, quality_info = Extractor(doc, plan, field_types, backend=backend).run()
+    return ExtractedPage(items, quality_info, find_next_link(doc), len(html), plan=plan)
+
+"""
+Process pool for the CPU bound part of a page: parsing, selector planning, extraction and the next link lookup.
+- The HTML goes to a worker as a string, only the items, counters and next link come back
+- A plan is pickled once per pool and its bytes ride along with every task, a few KB next to the HTML.
+  Each worker caches plans by id and only unpickles one it does not hold, so no task waits on a
+  worker that has not seen the plan and no HTML is sent twice
+- One pool can be shared by every agent of a batch so all of them spread over the cores
+- Workers are spawned, forking a process that runs an event loop and HTTP clients is not safe
+"""
+class CpuPool:
+    def __init__(self, workers: int):
+        self.workers = max(1, workers)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._plan_blobs: OrderedDict[str, bytes] = OrderedDict() # plan id -> pickled plan, least recently used first
+
+    def start(self) -> None:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+        self._executor = None
+
+    async def _run(self, func, *args) -> Any:
+        self.start()
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    # Parse html and extract it with an existing plan
+    async def extract(self, html: str, backend: str, plan: SelectorPlan, field_types: Dict[str, str]) -> ExtractedPage:
+        plan_id = self.plan_id(plan, field_types)
+        return await self._run(_extract_page, html, backend, plan_id, self._plan_blob(plan_id, plan, field_types))
+
+    def _plan_blob(self, plan_id: str, plan: SelectorPlan, field_types: Dict[str, str]) -> bytes:
+        blob = self._plan_blobs.get(plan_id)
+        if blob is None:
+            blob = self._plan_blobs[plan_id] = pickle.dumps((plan, field_types))
+            if len(self._plan_blobs) > WORKER_PLAN_CACHE_SIZE:
+                self._plan_blobs.popitem(last=False)
+        else:
+            self._plan_blobs.move_to_end(plan_id)
+        return blob
+
+    # Parse html, build a new plan from it and extract the page with that plan
+    async def plan(self, html: str, backend: str, collection_name: Optional[str], field_types: Dict[str, str]) -> ExtractedPage:
+        return await self._run(_plan_page, html, backend, collection_name, field_types)
+
+    @staticmethod
+    def plan_id(plan: SelectorPlan, field_types: Dict[str, str]) -> str:
+        return plan_fingerprint(plan, field_types)
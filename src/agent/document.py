@@ -0,0 +1,53 @@
+from __future__ import annotations
+from typing import Any, AsyncIterator, List, Optional
+from .parser_backends import get_backend
+
+"""
+A page's markup parsed once and shared by every pipeline step.
+SelectorPlanner, Extractor and the next link finder all read the same tree
+instead of each re-parsing the raw HTML string. The tree is either a
+BeautifulSoup or a native lxml tree depending on the parser backend.
+"""
+class ParsedDocument:
+    fetched_by = "browser" # "static" when the HTML came over plain HTTP without the browser
+
+    def __init__(self, html: str, backend: str = "bs4"):
+        self.html = html # Raw markup as retrieved from the MCP server
+        self.backend = get_backend(backend) # DOM primitives for the chosen tree type
+        self.root = self.backend.parse(html) # Parsed DOM tree
+
+    # BeautifulSoup tree, only available on the bs4 backend
+    @property
+    def soup(self):
+        if self.backend.name != "bs4":
+            raise AttributeError(f"ParsedDocument uses the '{self.backend.name}' backend, no soup available")
+        return self.root
+
+    # Accepts either raw HTML or an already parsed document
+    @classmethod
+    def of(cls, source: str | ParsedDocument, backend: str = "bs4") -> ParsedDocument:
+        if isinstance(source, ParsedDocument):
+            return source
+        return cls(source, backend=backend)
+
+    # Parses HTML while it is streamed in, with lxml the tree is built chunk by chunk
+    @classmethod
+    async def from_chunks(cls, chunks: AsyncIterator[bytes], backend: str = "bs4") -> ParsedDocument:
+        doc = cls.__new__(cls)
+        doc.backend = get_backend(backend)
+        feed = doc.backend.feed_parser()
+        async for chunk in chunks:
+            feed.feed(chunk)
+        doc.html, doc.root = feed.close()
+        return doc
+
+    # All elements under scope (default: whole document) matching a CSS selector
+    def select(self, css: str, scope: Any = None) -> List[Any]:
+        compiled = self.backend.compile(css)
+        if compiled is None:
+            return []
+        return self.backend.select(self.root if scope is None else scope, compiled)
+
+    def select_one(self, css: str, scope: Any = None) -> Optional[Any]:
+        found = self.select(css, scope)
+        return found[0] if found else None
@@ -1,8 +1,11 @@
 from __future__ import annotations
-from typing import Any, Dict, List, Optional
-from bs4 import BeautifulSoup
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 from datetime import datetime
-import re 
+from functools import lru_cache
+import re
+from .document import ParsedDocument
+from .quality import QualityAccumulator
+from .selector_engine import CompiledPlan
 
 # Assigns a value into a nested dictionary structure given a dottet key
 def _assign_nested(target: Dict[str, Any], dotted_key: str, value: Any) -> None:
@@ -22,145 +25,228 @@ def _assign_nested(target: Dict[str, Any], dotted_key: str, value: Any) -> None:
             
             cur = cur[part]
 
+# A number in one of the common shop formats, tried in this order at every position:
+# space grouped "€1 299" "1 299,00 kr", apostrophe grouped "1'250.50", comma grouped "1,099.50", dot grouped "1.299,00",
+# plain "899.99" "12,50". Space grouping only counts next to a currency symbol or code or before a decimal part,
+# "Pack of 2 100ml" and "3 250 g" are two numbers. The leading lookahead skips positions without a digit
+_NUMBER_RE = re.compile(
+    r"(?=\d)(?:"
+    r"(?:(?<=[$\u20ac\u00a3\u00a5\u20b9])|(?<=[$\u20ac\u00a3\u00a5\u20b9][ \u00a0\u202f])|(?<=\b[A-Z]{3}[ \u00a0\u202f])|(?<=\bkr[ \u00a0\u202f]))"
+    r"(\d{1,3}(?:[ \u00a0\u202f]\d{3})+)(?:[.,](\d+))?(?!\d)"
+    r"|(\d{1,3}(?:[ \u00a0\u202f]\d{3})+)(?:[.,](\d+)(?!\d)|(?=[ \u00a0\u202f]?(?:[$\u20ac\u00a3\u00a5\u20b9]|[A-Z]{3}\b|kr\b)))"
+    r"|(\d{1,3}(?:'\d{3})+)(?:[.,](\d+))?(?!\d)"
+    r"|([1-9]\d{0,2}(?:,\d{3})+)(?:\.(\d+))?(?![\d,])"
+    r"|([1-9]\d{0,2}(?:\.\d{3})+)(?:,(\d+))?(?![\d.])"
+    r"|(\d+)(?:[.,](\d+))?)"
+)
+_NON_DIGITS_RE = re.compile(r"\D")
+
+# Stock phrases decide wherever they appear, negative ones first so "not available" is not available.
+# Bare yes/no/true/false/1/0 only count as the whole text, "no fees" or "0-2 days" say nothing about stock
+_FALSY_RE = re.compile(r"\b(?:out of stock|outofstock|unavailable|sold out|not available)\b")
+_TRUTHY_RE = re.compile(r"\b(?:in stock|instock|available)\b")
+_BOOLEAN_TOKENS = {"yes": True, "true": True, "1": True, "no": False, "false": False, "0": False}
+
+# Converters take the raw text of a field, None or blank text is a missing value for all of them
+def _to_string(raw_text: Optional[str]) -> Optional[str]:
+    return raw_text.strip() or None if raw_text is not None else None
+
 """
-Attempts to cast a raw string into the expected data type defined 
-by the craping schema (string, number, boolean, datetime).
+First number in the text with currency symbols and words around it ignored.
+- Apostrophes between digit groups are thousands separators, spaces and no-break spaces only next
+  to a currency symbol or code ("€1 299", "1 299 SEK") or before a decimal part ("1 299,00")
+- ',' or '.' followed by groups of exactly three digits groups thousands, the other one is the
+  decimal point: "1,099.50" and "1.099,50" are both 1099.5, "1,299" is 1299
+- Otherwise a single ',' or '.' is the decimal point, "12,50" is 12.5
+Whole numbers come back as int, like "45.00" -> 45.
 """
-def _cast_value(raw_text: str, expected_type: str) -> Any:
-    if raw_text is None:
+def _to_number(raw_text: Optional[str]) -> int | float | None:
+    match = _NUMBER_RE.search(raw_text) if raw_text else None
+    if not match:
         return None
-    
-    text = raw_text.strip()
+    (priced, priced_frac, spaced, spaced_frac, quoted, quoted_frac,
+     comma_int, comma_frac, dot_int, dot_frac, plain, plain_frac) = match.groups()
+
+    if plain is not None:
+        whole, frac = plain, plain_frac
+    elif comma_int is not None:
+        whole, frac = comma_int.replace(",", ""), comma_frac
+    elif dot_int is not None:
+        whole, frac = dot_int.replace(".", ""), dot_frac
+    elif quoted is not None:
+        whole, frac = _NON_DIGITS_RE.sub("", quoted), quoted_frac
+    elif spaced is not None:
+        whole, frac = _NON_DIGITS_RE.sub("", spaced), spaced_frac
+    else:
+        whole, frac = _NON_DIGITS_RE.sub("", priced), priced_frac
+
+    if frac is None or not frac.strip("0"):
+        return int(whole)
+    return float(whole + "." + frac)
+
+# Boolean casting based on common textual patterns
+def _to_boolean(raw_text: Optional[str]) -> bool | None:
+    if not raw_text:
+        return None
+    lowered = raw_text.strip().lower()
+    if _FALSY_RE.search(lowered):
+        return False
+    if _TRUTHY_RE.search(lowered):
+        return True
+    return _BOOLEAN_TOKENS.get(lowered)
+
+def _to_datetime(raw_text: Optional[str]) -> str | None:
+    text = raw_text.strip() if raw_text else None
     if not text:
         return None
-    
-    t = expected_type.lower()
+    try:
+        return datetime.fromisoformat(text.replace("Z", "+00:00")).isoformat()
+    except ValueError:
+        return None
 
-    if t == "string":
-        return text
-    
-    if t == "number":
-        # extract first number including decimals and commas
-        match = re.search(r"[0-9]+(?:[.,][0-9]+)?", text)
-        if not match:
-            return None
-        num_txt = match.group(0).replace(",", ".")
-        try:
-            float_val = float(num_txt)
-            if float_val.is_integer():
-                return int(float_val)
-            return float(num_txt)
-        except ValueError: 
-            return None
+_CONVERTERS: Dict[str, Callable[[Optional[str]], Any]] = {
+    "string": _to_string,
+    "number": _to_number,
+    "boolean": _to_boolean,
+    "datetime": _to_datetime,
+}
+
+# Distinct raw texts remembered per type, availability labels and common prices repeat across items and pages
+CAST_CACHE_SIZE = 4096
+
+"""
+Caster for one schema type (string, number, boolean, datetime) chosen once per field instead of per value.
+Returns None for missing, blank or unparsable values, unknown types keep the stripped text.
+Parsing casters are memoised, string casting is cheaper than the cache lookup.
+"""
+@lru_cache(maxsize=None)
+def caster_for(expected_type: str) -> Callable[[Optional[str]], Any]:
+    convert = _CONVERTERS.get(expected_type.lower(), _to_string)
+    if convert is _to_string:
+        return convert
+    return lru_cache(maxsize=CAST_CACHE_SIZE)(convert)
+
+# Attempts to cast a raw string into the expected data type defined by the scraping schema
+def _cast_value(raw_text: str, expected_type: str) -> Any:
+    return caster_for(expected_type)(raw_text)
+
+"""
+Result of the MCP server's extract tool: the SelectorPlan was evaluated inside the browser
+and only raw values came back. Rows hold [value, candidate index] per field, the index
+points into the field's primary + fallback candidates of the plan that was sent.
+"""
+class BrowserExtraction:
+    def __init__(self, rows: List[Dict[str, Tuple[Optional[str], Optional[str]]]], next_href: Optional[str] = None):
+        self.rows = rows # field -> (raw value, winning selector) per item container
+        self.next_href = next_href # Next page link found in the page, when it was asked for
+
+    @classmethod
+    def from_tool_data(cls, data: Dict[str, Any], selector_plan) -> BrowserExtraction:
+        candidates = {
+            field: list(sels) + list(selector_plan.fallback_selectors.get(field, []))
+            for field, sels in selector_plan.field_selectors.items()
+        }
+        fields = data.get("fields", [])
+        rows = []
+        for raw_row in data.get("rows", []):
+            row: Dict[str, Tuple[Optional[str], Optional[str]]] = {field: (None, None) for field in candidates}
+            for field, hit in zip(fields, raw_row):
+                if hit and field in candidates:
+                    row[field] = (hit[0], candidates[field][hit[1]])
+            rows.append(row)
+        return cls(rows, data.get("next_href"))
+
+# Next page link of a parsed page, same strategies as the MCP server's in page lookup
+def find_next_link(doc: ParsedDocument) -> Optional[str]:
+    attr = doc.backend.get_attr
     
-    # Boolean casting based on common textual patterns
-    if t == "boolean":
-        lowered = text.lower()
-        truthy = ["in stock", "available", "yes", "true", "1", "instock"]
-        falsy  = ["out of stock", "unavailable", "no", "false", "0"]
-        if any(word in lowered for word in truthy):
-            return True
-        if any(word in lowered for word in falsy):
-            return False
-        return None
+    # Strategy 1: rel='next'
+    a = doc.select_one("a[rel='next']")
+    if a is not None and attr(a, "href"):
+        return attr(a, "href")
     
-    if t == "datetime":
-        try:
-            parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
-            return parsed.isoformat()
-        except ValueError:
-            return None
+    # Strategy 2: aria-label containing 'next'
+    a = doc.select_one("a[aria-label*='next' i]")
+    if a is not None and attr(a, "href"):
+        return attr(a, "href")
     
-    return text
-
-# Extract the most relevant textual or attribute value from a given element
-def _extract_candidate_value(el) -> str:
-    if el is None:
-        return None
+    # Strategy 3: Text matching 'next'
+    for cand in doc.select("a[href]"):
+        txt = doc.backend.text(cand).lower()
+        if txt in {"next", "next page"} or txt.endswith("»") or "next" in txt:
+            return attr(cand, "href")
     
-    if el.name == "img" and el.has_attr("src"):
-        src = el["src"].strip()
-        return src if src else None
-    if el.name == "a" and el.has_attr("href"):
-        href = el["href"].strip()
-        return href if href else None
+    # Strategy 4: Common pagination patterns
+    a = doc.select_one("li.next a[href], .pagination a.next[href], .pager a.next[href]")
+    if a is not None and attr(a, "href"):
+        return attr(a, "href")
     
-    text = el.get_text(separator=" ", strip=True)
-    return text if text else None
-        
+    return None
+
 # Generic data extractor that converts HTML and a selector plan into structured data
 class Extractor:
-    def __init__(self, html: str, selector_plan, field_types: Dict[str, str]):
-        # Parse the HTML into a DOM tree for CSS selector access
-        self.soup = BeautifulSoup(html, "lxml")
+    def __init__(self, html: str | ParsedDocument | BrowserExtraction, selector_plan, field_types: Dict[str, str], backend: str = "bs4"):
+        # Values already extracted in the browser skip the DOM entirely
+        self.browser_rows = html.rows if isinstance(html, BrowserExtraction) else None
+        # Reuse the parsed DOM tree when the caller already has one
+        self.document = None if self.browser_rows is not None else ParsedDocument.of(html, backend=backend)
         self.plan = selector_plan
         self.field_types = field_types
+        # field -> caster for its schema type
+        self.casters = {field: caster_for(field_types.get(field, "string")) for field in selector_plan.field_selectors}
+    
+    # field -> (raw value, winning selector) for every item container of the page
+    def _raw_rows(self) -> Iterable[Dict[str, Tuple[Optional[str], Optional[str]]]]:
+        if self.browser_rows is not None:
+            return self.browser_rows
+
+        compiled: CompiledPlan = self.plan.compiled(self.document.backend.name)
+        root = self.document.root
+
+        # Determine extraction scope: multiple containers or full page
+        containers = compiled.containers(root)
+        matchers = compiled.bind(root)
+        # One walk over the container resolves the first matching candidate of every field
+        return (compiled.first_values(container, matchers) for container in containers)
     
     """
     Executes the extraction plan and returns:
     - all_items -> list of structured records extracted from the HTML
-    - quality_info -> diagnostic info about missing fields per item
+    - quality_info -> page QualityAccumulator (missing field counts) and selector hits
     """
     def run(self) -> tuple[List[Dict[str, Any]], Dict[str, Any]]:
-        # Determine extraction scope: multiple containers or full page
-        if self.plan.item_selector: 
-            containers = self.soup.select(self.plan.item_selector)
-        else:
-            containers = [self.soup]
-        
         all_items: List[Dict[str, Any]] = []
-        missing_items: List[List[str]] = []
+        quality = QualityAccumulator()
+        # field -> winning selector -> number of items it supplied
+        selector_hits: Dict[str, Dict[str, int]] = {field: {} for field in self.plan.field_selectors}
+        casters = self.casters
 
         # Process each container
-        for container in containers:
+        for raw_values in self._raw_rows():
             item_data: Dict[str, Any] = {}
             missing_fields: List[str] = []
 
-            # Iterate over all target fields and their candidate selectors
-            for field_name, selector_candidates in self.plan.field_selectors.items(): 
-                expected_type = self.field_types.get(field_name, "string")
-
-                # Try each selector in order until one matches
-                raw_val: Optional[str] = self._extract_first_match(container, selector_candidates)
-                
-                if raw_val is None:
-                    missing_fields.append(field_name)
-                    continue
+            for field_name, cast in casters.items():
+                raw_val, winner = raw_values[field_name]
 
-                casted_val = _cast_value(raw_val, expected_type)
+                casted_val = cast(raw_val)
                 if casted_val is None:
                     missing_fields.append(field_name)
                     continue
 
                 _assign_nested(item_data, field_name, casted_val)
+                hits = selector_hits[field_name]
+                hits[winner] = hits.get(winner, 0) + 1
             
             # Only include non empty results
             if item_data:
                 all_items.append(item_data)
-                missing_items.append(missing_fields)
+                quality.add_item(missing_fields)
         
         quality_info = {
             "total_items": len(all_items),
-            "missing_items": missing_items,
+            "quality": quality,
+            "selector_hits": selector_hits,
         }
         
         return all_items, quality_info
-    
-    """
-    Attemps each CSS selector in order and return first non empty value
-    """
-    def _extract_first_match(self, scope, selector_candidates: List[str]) -> Optional[str]:
-        for sel in selector_candidates: 
-            try:
-                el = scope.select_one(sel)
-                if not el:
-                    continue
-
-                extracted = _extract_candidate_value(el)
-                if extracted:
-                    return extracted
-            except Exception:
-                # Skip broken selectors or parsing errors
-                continue
-        
-        return None
\ No newline at end of file
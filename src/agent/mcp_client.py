@@ -1,39 +1,128 @@
 from __future__ import annotations
-from typing import Optional, Any
+from typing import AsyncIterator, Optional, Any
+import copy
+import itertools
+import json
 import httpx
+from loguru import logger
+
+try:
+    import h2  # noqa: F401 - httpx only speaks HTTP/2 when h2 is installed
+except ImportError:
+    h2 = None
 
 # Raised when the MCP server returns an error response
 class MCPError(Exception):
     pass
 
+# Client side timeouts in seconds per tool, tools not listed here use MCPClient.timeout
+DEFAULT_TOOL_TIMEOUTS: dict[str, float] = {
+    "current_url": 3.0, # Never waits on the page, a slow answer means the server is stuck
+    "wait": 5.0,
+    "wait_for": 5.0,
+    "navigate": 30.0, # Covers the server's own 20 s goto timeout
+    "extract": 30.0,
+    "screenshot": 30.0,
+    "html": 60.0, # Serialising and sending a huge DOM legitimately takes long
+}
+
+# Params that make a call run longer on purpose, their value is added on top of the tool's timeout
+_DURATION_PARAMS = ("timeout_ms", "wait_timeout_ms", "duration_ms")
+
 """
 Async client wrapper for communicating with the local MCP server. 
 Internally all actions are routed through '_call_tool()' which matches the MCP API contract
+- base_url may list several MCP servers, open_session() leases sessions from them round robin and
+  the returned client stays pinned to the server that owns its session
+- One pooled httpx client (keep-alive, optional HTTP/2) is shared by every session client
+- Every call gets its own timeout, see DEFAULT_TOOL_TIMEOUTS
 """
 class MCPClient:
 
-    def __init__(self, base_url: str = "http://127.0.0.1:8000"):
-        # Base URL of the MCP server, Defualts to a local dev instance
-        self.base_url = base_url
+    def __init__(self, base_url: str | list[str] = "http://127.0.0.1:8000", session_id: Optional[str] = None,
+                 timeout: float = 10.0, tool_timeouts: Optional[dict[str, float]] = None,
+                 max_connections: int = 100, max_keepalive_connections: int = 20,
+                 keepalive_expiry: float = 30.0, http2: bool = False):
+        # Base URLs of the MCP servers, Defualts to a local dev instance
+        urls = [base_url] if isinstance(base_url, str) else list(base_url)
+        self.base_urls = [url.rstrip("/") for url in urls] or ["http://127.0.0.1:8000"]
+        # Server this client's calls go to
+        self.base_url = self.base_urls[0]
+        # Leased browser session on the server, None drives the shared default page
+        self.session_id = session_id
+        self.timeout = timeout
+        self.tool_timeouts = {**DEFAULT_TOOL_TIMEOUTS, **(tool_timeouts or {})}
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive_connections,
+                                   keepalive_expiry=keepalive_expiry)
+        self.http2 = http2
         self._client: Optional[httpx.AsyncClient] = None
+        self._owns_client = True
+        # Shared with every session client so sessions spread evenly across servers
+        self._rotation = itertools.cycle(self.base_urls)
 
     # Creates an AsyncClient session that keeps the connection open for reuse across multiple tool calls
     async def start(self) -> None: 
         if self._client is None:
-            self._client = httpx.AsyncClient(timeout=10)
+            http2 = self.http2 and h2 is not None
+            if self.http2 and not http2:
+                logger.warning("HTTP/2 requested but the h2 package is not installed, using HTTP/1.1")
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits, http2=http2)
+            self._owns_client = True
     
     # Closes the underlying HTTP session when the agent shuts down
     async def stop(self) -> None: 
-        if self._client is not None:
+        if self._client is not None and self._owns_client:
             await self._client.aclose()
-            self._client = None
+        self._client = None
+
+    # Returns a client bound to another browser session (on base_url, default this client's server) that shares this client's connection pool
+    def with_session(self, session_id: str, base_url: Optional[str] = None) -> MCPClient:
+        clone = copy.copy(self)
+        clone.session_id = session_id
+        clone.base_url = base_url or self.base_url
+        clone._owns_client = False
+        return clone
+
+    # Leases a new isolated browser session on the next server in the rotation and returns a client bound to it,
+    # a server that can not be reached is skipped
+    async def open_session(self, session_id: Optional[str] = None) -> MCPClient:
+        assert self._client is not None
+
+        last_error: Exception | None = None
+        for _ in range(len(self.base_urls)):
+            base_url = next(self._rotation)
+            try:
+                response = await self._client.post(f"{base_url}/mcp/sessions/open", json={"session_id": session_id},
+                                                   timeout=self.timeout)
+            except httpx.TransportError as e:
+                last_error = e
+                continue
+            body = response.json()
+            if not body.get("ok", False):
+                raise MCPError(f"open_session failed on {base_url}: {body.get('error', 'Unknown MCP error')}")
+            return self.with_session(body["data"]["session_id"], base_url)
+
+        raise MCPError(f"open_session failed, no MCP server reachable: {last_error}")
+
+    # Releases the browser session this client is bound to
+    async def close_session(self) -> None:
+        if self._client is None or self.session_id is None:
+            return
+        await self._client.post(f"{self.base_url}/mcp/sessions/close", json={"session_id": self.session_id}, timeout=self.timeout)
+
+    # Seconds a call may take, the tool's timeout plus any wait the params ask for
+    def _timeout_for(self, tool: str, params: dict[str, Any]) -> float:
+        extra_ms = sum(params[key] for key in _DURATION_PARAMS if isinstance(params.get(key), (int, float)))
+        return self.tool_timeouts.get(tool, self.timeout) + extra_ms / 1000
     
     # Internal method for invoking any MCP tool
     async def _call_tool(self, tool: str, params: dict[str, Any]) -> dict[str, Any]:
         assert self._client is not None
 
-        payload = {"tool": tool, "params": params}
-        response = await self._client.post(f"{self.base_url}/mcp/tools/call", json=payload)
+        payload: dict[str, Any] = {"tool": tool, "params": params}
+        if self.session_id is not None:
+            payload["session_id"] = self.session_id
+        response = await self._client.post(f"{self.base_url}/mcp/tools/call", json=payload, timeout=self._timeout_for(tool, params))
 
         body = response.json()
         
@@ -43,7 +132,36 @@ class MCPClient:
             raise MCPError(f"{tool} failed: {err}")
         
         return body.get("data", {})
-    
+
+    """
+    Runs an ordered list of (tool, params) calls on this client's session in one HTTP round trip.
+    Returns the data of every call in order, raises MCPError for the first failed call since the
+    server stops the batch there. Servers without the batch endpoint get the calls one by one.
+    The batch may take as long as its calls' timeouts added up.
+    """
+    async def call_batch(self, calls: list[tuple[str, dict[str, Any]]]) -> list[Any]:
+        assert self._client is not None
+
+        payload: dict[str, Any] = {"calls": [{"tool": tool, "params": params} for tool, params in calls]}
+        if self.session_id is not None:
+            payload["session_id"] = self.session_id
+        timeout = sum(self._timeout_for(tool, params) for tool, params in calls)
+        response = await self._client.post(f"{self.base_url}/mcp/tools/batch", json=payload, timeout=timeout)
+
+        if response.status_code == 404:
+            return [await self._call_tool(tool, params) for tool, params in calls]
+
+        body = response.json()
+        results = body.get("results", [])
+        for (tool, _), result in zip(calls, results):
+            if not result.get("ok", False):
+                raise MCPError(f"{tool} failed: {result.get('error', 'Unknown MCP error')}")
+
+        if not body.get("ok", False) or len(results) < len(calls):
+            raise MCPError(f"batch failed: {body.get('error', 'Unknown MCP error')}")
+
+        return [result.get("data", {}) for result in results]
+
     # Public methods for the agent to use
     # Each corresponds 1:1 to a registered tool on the MCP server
 
@@ -70,6 +188,27 @@ class MCPClient:
     
     async def html(self) -> str:
         data = await self._call_tool("html", {})
+        return self.markup_of(data)
+
+    """
+    Streams the session's rendered HTML as raw UTF-8 chunks. The server compresses the body with
+    zstd or gzip and httpx decodes it on the fly, so the markup is never JSON escaped or buffered
+    whole. Raises MCPError when the server answers with an error ToolResponse instead.
+    """
+    async def iter_html(self, chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+        assert self._client is not None
+
+        async with self._client.stream("POST", f"{self.base_url}/mcp/tools/html/stream", json={"session_id": self.session_id},
+                                       timeout=self._timeout_for("html", {})) as response:
+            if response.headers.get("content-type", "").startswith("application/json"):
+                body = json.loads(await response.aread())
+                raise MCPError(f"html failed: {body.get('error') or body.get('detail') or 'Unknown MCP error'}")
+            async for chunk in response.aiter_bytes(chunk_size):
+                yield chunk
+
+    # Markup from the data of an html call, also used on batch results
+    @staticmethod
+    def markup_of(data: Any) -> str:
         if isinstance(data, dict) and "html" in data:
             return data["html"]
         
@@ -86,3 +225,5 @@ class MCPClient:
         data = await self._call_tool("current_url", {})
         return data.get("url", "")
 
+    async def wait(self, duration_ms: int) -> dict[str, Any]:
+        return await self._call_tool("wait", {"duration_ms": duration_ms})
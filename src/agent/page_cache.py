@@ -0,0 +1,163 @@
+from __future__ import annotations
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+from datetime import datetime
+import hashlib
+import json
+import os
+
+from .cpu_pool import ExtractedPage
+from .plan_cache import plan_fingerprint
+from .quality import QualityAccumulator
+from .select_planner import SelectorPlan
+
+"""
+Local cache of extracted pages keyed by URL + hash of the retrieved HTML + plan version.
+A page whose markup did not change since an earlier run with the same plan comes back
+without parsing or extraction, only the fetch and the hash are paid for.
+- One JSON file per page under cache_dir holding its items, quality counters, selector hits and next link
+- Bounded to max_bytes on disk, the least recently used files are evicted first. Recency is the
+  file's mtime, touched on every hit, so it carries over between runs and agents sharing the directory
+- For statically fetched pages the response's ETag / Last-Modified are kept per URL under
+  validators/, with the hash of the HTML they belong to. A 304 to the next conditional request
+  is answered from the page stored for that hash, see revalidated(). These files count towards
+  max_bytes and are evicted like pages, a URL without them is simply fetched in full
+- hits/misses/stored/evicted count this instance's lookups, not_modified the 304s served from the
+  cache and bytes_saved the HTML those did not transfer, reported in the result metadata
+"""
+class PageCache:
+    def __init__(self, cache_dir: str = "artifacts/page_cache", max_bytes: int = 256 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0, "not_modified": 0, "bytes_saved": 0}
+        self._index: Optional[OrderedDict[Path, int]] = None # path -> size, least recently used first
+        self._total_bytes = 0
+
+    @staticmethod
+    def html_hash(html: str) -> str:
+        return hashlib.sha1(html.encode("utf-8", errors="replace")).hexdigest()
+
+    def key(self, url: str, html_hash: str, plan: SelectorPlan, field_types: Dict[str, str]) -> str:
+        raw = "\0".join((url, html_hash, plan_fingerprint(plan, field_types)))
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    # Existing pages and validators by last use, scanned once per instance on first access
+    def _load_index(self) -> OrderedDict[Path, int]:
+        if self._index is None:
+            entries = []
+            if self.cache_dir.exists():
+                for path in [*self.cache_dir.glob("*.json"), *self.cache_dir.glob("validators/*.json")]:
+                    try:
+                        stat = path.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, path, stat.st_size))
+            entries.sort()
+            self._index = OrderedDict((path, size) for _, path, size in entries)
+            self._total_bytes = sum(self._index.values())
+        return self._index
+
+    def load(self, key: str) -> Optional[ExtractedPage]:
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            # Missing, evicted by another agent or corrupt -> a miss, a corrupt file is overwritten on store
+            self.stats["misses"] += 1
+            return None
+
+        self.stats["hits"] += 1
+        self._touch(path)
+
+        quality_info = {
+            "total_items": len(entry["items"]),
+            "quality": QualityAccumulator.from_dict(entry["quality"]),
+            "selector_hits": entry.get("selector_hits", {}),
+        }
+        return ExtractedPage(entry["items"], quality_info, entry.get("next_href"), entry.get("html_length", 0))
+
+    def store(self, key: str, url: str, page: ExtractedPage) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entry = {
+            "url": url,
+            "items": page.items,
+            "quality": page.quality_info["quality"].to_dict(),
+            "selector_hits": page.quality_info.get("selector_hits", {}),
+            "next_href": page.next_href,
+            "html_length": page.html_length,
+            "stored_at": datetime.utcnow().isoformat() + "Z",
+        }
+        data = json.dumps(entry, ensure_ascii=False, default=str).encode("utf-8")
+        self._write(self._path(key), data)
+        self.stats["stored"] += 1
+
+    # Write a page or validators file as the most recently used entry and evict down to max_bytes
+    def _write(self, path: Path, data: bytes) -> None:
+        path.write_bytes(data)
+        index = self._load_index()
+        self._total_bytes += len(data) - index.pop(path, 0)
+        index[path] = len(data)
+        self._evict()
+
+    def _touch(self, path: Path) -> None:
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        index = self._load_index()
+        if path in index:
+            index.move_to_end(path)
+
+    def _validators_path(self, url: str) -> Path:
+        return self.cache_dir / "validators" / f"{hashlib.sha1(url.encode('utf-8')).hexdigest()}.json"
+
+    """
+    {"etag", "last_modified", "html_hash"} remembered for url, None when there are none or the page
+    they stand for is no longer cached for this plan, a conditional request would be wasted then.
+    """
+    def validators(self, url: str, plan: SelectorPlan, field_types: Dict[str, str]) -> Optional[Dict[str, str]]:
+        path = self._validators_path(url)
+        try:
+            validators = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        html_hash = validators.get("html_hash")
+        if not html_hash or not self._path(self.key(url, html_hash, plan, field_types)).exists():
+            return None
+        self._touch(path)
+        return validators
+
+    # Remember the validators of a 200 response for url, responses without any are forgotten
+    def store_validators(self, url: str, validators: Dict[str, str], html_hash: str) -> None:
+        path = self._validators_path(url)
+        if not validators:
+            path.unlink(missing_ok=True)
+            self._total_bytes -= self._load_index().pop(path, 0)
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._write(path, json.dumps({**validators, "url": url, "html_hash": html_hash}, ensure_ascii=False).encode("utf-8"))
+
+    """
+    The page a 304 for url stands for: the one stored for the HTML the validators belong to, extracted
+    with the same plan. None when it was evicted in the meantime, the page must then be fetched in full.
+    """
+    def revalidated(self, url: str, validators: Dict[str, str], plan: SelectorPlan, field_types: Dict[str, str]) -> Optional[ExtractedPage]:
+        html_hash = validators.get("html_hash")
+        page = self.load(self.key(url, html_hash, plan, field_types)) if html_hash else None
+        if page is not None:
+            self.stats["not_modified"] += 1
+            self.stats["bytes_saved"] += page.html_length
+        return page
+
+    # Drop least recently used entries until the cache fits max_bytes, the newest entry always stays
+    def _evict(self) -> None:
+        index = self._load_index()
+        while self._total_bytes > self.max_bytes and len(index) > 1:
+            path, size = index.popitem(last=False)
+            path.unlink(missing_ok=True)
+            self._total_bytes -= size
+            self.stats["evicted"] += 1
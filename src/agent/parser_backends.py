@@ -0,0 +1,224 @@
+from __future__ import annotations
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from bs4 import BeautifulSoup, Tag
+import soupsieve as sv
+import lxml.html
+from lxml import etree
+from cssselect import HTMLTranslator, SelectorError, parse as parse_css
+from cssselect.parser import CombinedSelector
+from cssselect.xpath import ExpressionError
+
+# Elements whose text never counts as visible content
+_NON_TEXT_TAGS = {"script", "style", "template"}
+
+"""
+Extraction backends -> the DOM primitives SelectorPlanner, Extractor and the
+next link finder need, implemented once on BeautifulSoup and once on a native lxml tree.
+A backend is selected per job through ScrapeConfig.options.parser_backend.
+"""
+class Bs4Backend:
+    name = "bs4"
+
+    def __init__(self):
+        # Ad hoc selectors (next link lookup, planner probes) repeat on every page
+        self.compile = lru_cache(maxsize=512)(self.compile)
+
+    def parse(self, html: str):
+        return BeautifulSoup(html, "lxml")
+
+    # BeautifulSoup can not parse incrementally, chunks are only collected
+    def feed_parser(self) -> "_BufferedFeed":
+        return _BufferedFeed(self.parse)
+
+    # Compile one CSS selector, returns None for selectors soupsieve can not parse
+    def compile(self, css: str) -> Optional[sv.SoupSieve]:
+        try:
+            return sv.compile(css)
+        except (sv.SelectorSyntaxError, NotImplementedError, ValueError, TypeError):
+            return None
+
+    def select(self, scope, compiled) -> list:
+        return compiled.select(scope)
+
+    # Element -> does it match, bound once per document
+    def matcher(self, compiled, root) -> Callable[[Any], bool]:
+        return compiled.match
+
+    def iter_elements(self, scope) -> Iterator[Tag]:
+        for el in scope.descendants:
+            if isinstance(el, Tag):
+                yield el
+
+    def tag(self, el) -> str:
+        return el.name
+
+    def attrs(self, el) -> Dict[str, str]:
+        return {k: " ".join(v) if isinstance(v, list) else v for k, v in el.attrs.items()}
+
+    def get_attr(self, el, name: str) -> Optional[str]:
+        value = el.get(name)
+        if isinstance(value, list):
+            return " ".join(value)
+        return value
+
+    def classes(self, el) -> List[str]:
+        return list(el.get("class", []))
+
+    def children(self, el) -> List[Tag]:
+        return [c for c in el.children if isinstance(c, Tag)]
+
+    def text(self, el) -> str:
+        return el.get_text(separator=" ", strip=True)
+
+    # Keys an element can be looked up under in the compiled plan's anchor index
+    def element_keys(self, el) -> List[str]:
+        keys = [el.name]
+        for attr, value in el.attrs.items():
+            keys.append("[" + attr)
+            if attr == "class":
+                keys.extend("." + c for c in value)
+        return keys
+
+
+class LxmlBackend:
+    name = "lxml"
+
+    def __init__(self):
+        self._translator = HTMLTranslator()
+        self._parser = lxml.html.HTMLParser(encoding="utf-8")
+        self.compile = lru_cache(maxsize=512)(self.compile)
+
+    def parse(self, html: str):
+        if not html or not html.strip():
+            html = "<html></html>"
+        return lxml.html.document_fromstring(html.encode("utf-8"), parser=self._parser)
+
+    # Incremental parser, the tree is built while the HTML is still being received
+    def feed_parser(self) -> "_LxmlFeed":
+        return _LxmlFeed(self.parse)
+
+    # Translate CSS to a compiled XPath, returns None for selectors cssselect can not translate
+    def compile(self, css: str) -> Optional[_CssXPath]:
+        try:
+            compiled = _CssXPath(self._translator.css_to_xpath(css, prefix="descendant-or-self::"))
+            compiled.combined = any(isinstance(sel.parsed_tree, CombinedSelector) for sel in parse_css(css))
+            return compiled
+        except (SelectorError, ExpressionError, etree.XPathSyntaxError, NotImplementedError, ValueError, TypeError):
+            return None
+
+    """
+    Matches below scope with soupsieve's scoped semantics: combinators may reach ancestors outside
+    scope ("body .price" finds the price in a card) but only scope's descendants are returned
+    (".card ~ .x" finds nothing inside a card). Run from scope the XPath of a selector with
+    combinators gets both wrong, so it is matched on the whole document and filtered instead.
+    A single compound selector only tests the element itself and runs from scope directly.
+    """
+    def select(self, scope, compiled) -> list:
+        if scope.getparent() is None:
+            return compiled(scope)
+        if not compiled.combined:
+            return [el for el in compiled(scope) if el is not scope]
+        inside = set(scope.iterdescendants())
+        return [el for el in compiled(scope.getroottree().getroot()) if el in inside]
+
+    # XPath can not test a single node against a CSS selector, so the matching set
+    # is computed once per document and membership is tested instead
+    def matcher(self, compiled, root) -> Callable[[Any], bool]:
+        matched = set(compiled(root.getroottree().getroot()))
+        return matched.__contains__
+
+    def iter_elements(self, scope) -> Iterator[Any]:
+        for el in scope.iterdescendants():
+            if isinstance(el.tag, str):
+                yield el
+
+    def tag(self, el) -> str:
+        return el.tag
+
+    def attrs(self, el) -> Dict[str, str]:
+        return dict(el.attrib)
+
+    def get_attr(self, el, name: str) -> Optional[str]:
+        return el.get(name)
+
+    def classes(self, el) -> List[str]:
+        return (el.get("class") or "").split()
+
+    def children(self, el) -> List[Any]:
+        return [c for c in el if isinstance(c.tag, str)]
+
+    # Same result as BeautifulSoup's get_text(separator=" ", strip=True)
+    def text(self, el) -> str:
+        parts: List[str] = []
+        self._collect_text(el, parts)
+        return " ".join(p.strip() for p in parts if p.strip())
+
+    def _collect_text(self, el, parts: List[str]) -> None:
+        if el.tag in _NON_TEXT_TAGS:
+            return
+        if el.text:
+            parts.append(el.text)
+        for child in el:
+            # Comments and processing instructions only contribute their tail
+            if isinstance(child.tag, str):
+                self._collect_text(child, parts)
+            if child.tail:
+                parts.append(child.tail)
+
+    def element_keys(self, el) -> List[str]:
+        keys = [el.tag]
+        for attr, value in el.attrib.items():
+            keys.append("[" + attr)
+            if attr == "class":
+                keys.extend("." + c for c in value.split())
+        return keys
+
+
+# Compiled CSS selector, combined is set when it has combinators and so depends on elements around a match
+class _CssXPath(etree.XPath):
+    combined = False
+
+
+"""
+Incremental parsing -> feed(chunk) per received UTF-8 chunk, close() returns
+the markup and the same root parse(markup) would have produced.
+"""
+class _BufferedFeed:
+    def __init__(self, parse: Callable[[str], Any]):
+        self._parse = parse
+        self._chunks: List[bytes] = []
+
+    def feed(self, chunk: bytes) -> None:
+        self._chunks.append(chunk)
+
+    def close(self) -> tuple[str, Any]:
+        html = b"".join(self._chunks).decode("utf-8", errors="replace")
+        return html, self._parse(html)
+
+
+class _LxmlFeed(_BufferedFeed):
+    def __init__(self, parse: Callable[[str], Any]):
+        super().__init__(parse)
+        # libxml2's push parser, one per document since feeding is stateful
+        self._parser = lxml.html.HTMLParser(encoding="utf-8")
+
+    def feed(self, chunk: bytes) -> None:
+        self._chunks.append(chunk)
+        if chunk:
+            self._parser.feed(chunk)
+
+    def close(self) -> tuple[str, Any]:
+        html = b"".join(self._chunks).decode("utf-8", errors="replace")
+        if not html.strip():
+            return html, self._parse(html)
+        return html, self._parser.close()
+
+
+_BACKENDS = {"bs4": Bs4Backend(), "lxml": LxmlBackend()}
+
+def get_backend(name: str = "bs4"):
+    try:
+        return _BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown parser backend '{name}', expected one of {sorted(_BACKENDS)}")
@@ -0,0 +1,96 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+from datetime import datetime
+import hashlib
+import json
+
+from .document import ParsedDocument
+from .select_planner import SelectorPlan
+
+# Stable short hash of any JSON serialisable value
+def _fingerprint(value: Any) -> str:
+    raw = json.dumps(value, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+# Hash of the expected field names and types, a schema change means a new plan
+def schema_fingerprint(expected_fields: Dict[str, str]) -> str:
+    return _fingerprint(expected_fields)
+
+# Version of a plan for the schema it extracts, any change to its selectors or the field types gives a new one
+def plan_fingerprint(plan: SelectorPlan, expected_fields: Dict[str, str]) -> str:
+    return _fingerprint([plan.to_dict(), expected_fields])
+
+"""
+Hash of the page's structure rather than its content: the set of distinct
+tag + class signatures. Listing pages with other products or another item
+count hash the same, a redesign that renames or restructures markup does not.
+"""
+def structure_fingerprint(document: ParsedDocument) -> str:
+    backend = document.backend
+    signatures = set()
+    for el in backend.iter_elements(document.root):
+        signatures.add(".".join([backend.tag(el), *sorted(backend.classes(el))]))
+    return _fingerprint(sorted(signatures))
+
+"""
+Local cache of learned SelectorPlans keyed by host + schema + DOM structure.
+One JSON file per key under cache_dir, each remembers the completion rate the
+plan reached when it was stored so a later drop can invalidate it.
+"""
+class PlanCache:
+    def __init__(self, cache_dir: str = "artifacts/plan_cache", tolerance: float = 0.1):
+        self.cache_dir = Path(cache_dir)
+        self.tolerance = tolerance # Allowed completion rate drop before a cached plan is discarded
+
+    def key(self, url: str, expected_fields: Dict[str, str], document: ParsedDocument) -> str:
+        host = urlparse(url).netloc or "local"
+        return f"{host}-{schema_fingerprint(expected_fields)}-{structure_fingerprint(document)}"
+
+    def _path(self, key: str) -> Path:
+        # Ports and odd characters in hosts must not end up in file names
+        safe = "".join(ch if ch.isalnum() or ch in "-." else "_" for ch in key)
+        return self.cache_dir / f"{safe}.json"
+
+    def _read(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        if not path.exists():
+            return None
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            # Corrupt entries behave like a miss and get overwritten on the next store
+            return None
+
+    def load(self, key: str) -> Optional[SelectorPlan]:
+        entry = self._read(key)
+        if entry is None:
+            return None
+        return SelectorPlan.from_dict(entry["plan"])
+
+    def store(self, key: str, plan: SelectorPlan, completion_rate: float) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entry = {
+            "key": key,
+            "plan": plan.to_dict(),
+            "completion_rate": completion_rate,
+            "stored_at": datetime.utcnow().isoformat() + "Z",
+        }
+        self._path(key).write_text(json.dumps(entry, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    def invalidate(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
+
+    """
+    Called after a run that used the cached plan.
+    Returns False and drops the entry when the completion rate fell more than tolerance.
+    """
+    def validate(self, key: str, completion_rate: float) -> bool:
+        entry = self._read(key)
+        if entry is None:
+            return False
+        if completion_rate < entry.get("completion_rate", 0.0) - self.tolerance:
+            self.invalidate(key)
+            return False
+        return True
@@ -0,0 +1,60 @@
+from __future__ import annotations
+from typing import Dict, Iterable, List
+
+"""
+Running extraction quality counters, replaces keeping a list of missing fields per item.
+- Extractor.run fills one accumulator per page with add_item()
+- Page accumulators are merged into the run's accumulator, accumulators of separate workers merge the same way
+- Only counts are kept: items, complete items, missing items per field and items/complete per page
+"""
+class QualityAccumulator:
+    def __init__(self):
+        self.total_items = 0
+        self.complete_items = 0
+        self.missing_counts: Dict[str, int] = {} # field -> number of items it is missing from
+        self.pages: List[Dict[str, int]] = [] # {"page", "items", "complete_items"} per merged page
+
+    # Count one extracted item given the fields it is missing
+    def add_item(self, missing_fields: Iterable[str] = ()) -> None:
+        self.total_items += 1
+        complete = True
+        for field in missing_fields:
+            complete = False
+            self.missing_counts[field] = self.missing_counts.get(field, 0) + 1
+        if complete:
+            self.complete_items += 1
+
+    # Add other's counts, with page the merged counts are also recorded as that page's stats
+    def merge(self, other: QualityAccumulator, page: int | None = None) -> None:
+        self.total_items += other.total_items
+        self.complete_items += other.complete_items
+        for field, count in other.missing_counts.items():
+            self.missing_counts[field] = self.missing_counts.get(field, 0) + count
+        if page is not None:
+            self.pages.append({"page": page, "items": other.total_items, "complete_items": other.complete_items})
+        else:
+            self.pages.extend(other.pages)
+
+    @property
+    def incomplete_items(self) -> int:
+        return self.total_items - self.complete_items
+
+    @property
+    def completion_rate(self) -> float:
+        return self.complete_items / self.total_items if self.total_items else 0.0
+
+    # Counts of one page as plain JSON, e.g. for the page cache, per page stats are left out
+    def to_dict(self) -> Dict[str, object]:
+        return {"total_items": self.total_items, "complete_items": self.complete_items, "missing_counts": dict(self.missing_counts)}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, object]) -> QualityAccumulator:
+        acc = cls()
+        acc.total_items = int(data.get("total_items", 0))
+        acc.complete_items = int(data.get("complete_items", 0))
+        acc.missing_counts = dict(data.get("missing_counts", {}))
+        return acc
+
+    # Missing counts, most often missing field first
+    def most_missing(self) -> List[tuple[str, int]]:
+        return sorted(self.missing_counts.items(), key=lambda kv: -kv[1])
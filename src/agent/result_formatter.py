@@ -1,5 +1,7 @@
 from typing import Any, Dict, List, Optional
 import json
+from src.agent.quality import QualityAccumulator
+from src.agent.result_writer import ResultWriter
 
 # Formats extraction results and builds a quality report 
 class ResultFormatter: 
@@ -8,8 +10,10 @@ class ResultFormatter:
         self.expected_fields = expected_fields
 
     # Return a unified success response with data and quality metrics
-    def format_success(self, items: List[Dict[str, Any]], metadata: Dict[str, Any], missing_items: List[List[str]]) -> Dict[str, Any]:
-        quality_report = self._generate_quality_report(items, missing_items)
+    def format_success(self, items: List[Dict[str, Any]], metadata: Dict[str, Any], quality: QualityAccumulator, selector_hits: Optional[Dict[str, Dict[str, int]]] = None) -> Dict[str, Any]:
+        quality_report = self._generate_quality_report(quality)
+        if selector_hits is not None:
+            quality_report["selector_hits"] = self._sort_selector_hits(selector_hits)
 
         data = {
             self.collection_name: items, 
@@ -22,6 +26,20 @@ class ResultFormatter:
             "quality_report": quality_report
         }
 
+    # Success response for a run whose items were streamed to writer, closes the writer with the same
+    # metadata and quality report, the items themselves are only in the writer's file
+    def format_streamed(self, writer: ResultWriter, metadata: Dict[str, Any], quality: QualityAccumulator, selector_hits: Optional[Dict[str, Dict[str, int]]] = None) -> Dict[str, Any]:
+        quality_report = self._generate_quality_report(quality)
+        if selector_hits is not None:
+            quality_report["selector_hits"] = self._sort_selector_hits(selector_hits)
+
+        writer.close({"status": "success", "metadata": metadata, "quality_report": quality_report})
+        return {
+            "status": "success",
+            "data": {"metadata": metadata},
+            "quality_report": quality_report
+        }
+
     # Return a unified error response structure
     def format_error(self, error_message: str, error_details: Optional[str] = None) -> Dict[str, Any]:
         return {
@@ -32,56 +50,23 @@ class ResultFormatter:
             "quality_report": None
         }
 
-    # Compute summary stats -> totals, completion rate, missing field counts
-    def _generate_quality_report(self, items: List[Dict[str, Any]], missing_items: List[List[str]]) -> Dict[str, Any]:
-        total_items = len(items)
-
-        if total_items == 0: 
-            return {
-                "total_items": 0,
-                "complete_items": 0,
-                "completion_rate": 0.0,
-                "missing_fields_summary": [],
-                "errors": []
-            }
-        
-        # Align list lengths 
-        while len(missing_items) < total_items:
-            missing_items.append([])
-
-        # Count complete items 
-        complete_items = sum(1 for missing in missing_items[:total_items] if len(missing) == 0)
-        # Calcultae completion rate
-        completion_rate = complete_items / total_items if total_items > 0 else 0.0
-
-        # Aggregate missing fields
-        missing_fields_summary = self._aggregate_missing_fields(missing_items)
-
+    # Compute summary stats -> totals, completion rate, missing field counts, items per page
+    def _generate_quality_report(self, quality: QualityAccumulator) -> Dict[str, Any]:
         return {
-            "total_items": total_items,
-            "complete_items": complete_items,
-            "completion_rate": round(completion_rate, 3),
-            "missing_fields_summary": missing_fields_summary,
+            "total_items": quality.total_items,
+            "complete_items": quality.complete_items,
+            "completion_rate": round(quality.completion_rate, 3),
+            "missing_fields_summary": [f"{field}: {count} items" for field, count in quality.most_missing()],
+            "pages": quality.pages,
             "errors": []
         }
     
-    # Count how often each field was missing and return sorted summary strings
-    def _aggregate_missing_fields(self, missing_items: List[List[str]]) -> List[str]:
-        from collections import Counter 
-
-        all_missing = []
-        for missing_list in missing_items:
-            all_missing.extend(missing_list)
-        
-        if not all_missing:
-            return []
-        
-        counts = Counter(all_missing)
-        result = []
-        for field, count in counts.most_common():
-            result.append(f"{field}: {count} items")
-        
-        return result
+    # Per field candidate hit counts, most productive selector first
+    def _sort_selector_hits(self, selector_hits: Dict[str, Dict[str, int]]) -> Dict[str, Dict[str, int]]:
+        return {
+            field: dict(sorted(hits.items(), key=lambda kv: -kv[1]))
+            for field, hits in selector_hits.items()
+        }
     
     # Write formatted result to disk as JSON 
     def save_to_file(self, result: Dict[str, Any], file_path: str) -> None:
@@ -0,0 +1,88 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, IO, List, Optional
+import abc
+import json
+
+"""
+Writes a run's items to disk page by page instead of holding them until the end.
+- write_page() appends one page of items and flushes, so the file can be tailed while the crawl runs
+- close() appends the status, metadata and quality report once the run is over, also after an error
+"""
+class ResultWriter(abc.ABC):
+    def __init__(self, file_path: str, collection_name: str):
+        self.file_path = Path(file_path)
+        self.collection_name = collection_name
+        self.items_written = 0
+        self._file: Optional[IO[str]] = None
+
+    def open(self) -> None:
+        if self._file is None:
+            self.file_path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.file_path, "w", encoding="utf-8")
+            self._write_head()
+
+    def write_page(self, items: List[Dict[str, Any]]) -> None:
+        self.open()
+        for item in items:
+            self._write_item(item)
+        self._file.flush()
+        self.items_written += len(items)
+
+    # tail holds status, metadata, quality_report and error
+    def close(self, tail: Dict[str, Any]) -> None:
+        self.open()
+        self._write_tail(tail)
+        self._file.close()
+        self._file = None
+
+    def _write_head(self) -> None:
+        pass
+
+    @abc.abstractmethod
+    def _write_item(self, item: Dict[str, Any]) -> None:
+        ...
+
+    @abc.abstractmethod
+    def _write_tail(self, tail: Dict[str, Any]) -> None:
+        ...
+
+# One item per line, the last line is {"status", "metadata", "quality_report"}
+class NdjsonResultWriter(ResultWriter):
+    def _write_item(self, item: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+    def _write_tail(self, tail: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(tail, ensure_ascii=False, default=str) + "\n")
+
+"""
+The same document ResultFormatter.save_to_file writes, with the items streamed into the collection
+array as they arrive. status and quality_report follow the data since they are only known at the end.
+"""
+class JsonArrayResultWriter(ResultWriter):
+    def __init__(self, file_path: str, collection_name: str):
+        super().__init__(file_path, collection_name)
+        self._first = True
+
+    def _write_head(self) -> None:
+        self._file.write('{\n  "data": {\n    ' + json.dumps(self.collection_name) + ": [")
+
+    def _write_item(self, item: Dict[str, Any]) -> None:
+        self._file.write(("\n      " if self._first else ",\n      ") + json.dumps(item, ensure_ascii=False))
+        self._first = False
+
+    def _write_tail(self, tail: Dict[str, Any]) -> None:
+        tail = dict(tail)
+        self._file.write(("]" if self._first else "\n    ]") + ',\n    "metadata": '
+                         + json.dumps(tail.pop("metadata", {}), ensure_ascii=False, default=str) + "\n  }")
+        for key, value in tail.items():
+            self._file.write(f",\n  {json.dumps(key)}: " + json.dumps(value, ensure_ascii=False, default=str))
+        self._file.write("\n}\n")
+
+def open_writer(output_format: str, file_path: str, collection_name: str) -> ResultWriter:
+    writers = {"ndjson": NdjsonResultWriter, "json": JsonArrayResultWriter}
+    if output_format not in writers:
+        raise ValueError(f"Unknown output format '{output_format}', expected one of {sorted(writers)}")
+    writer = writers[output_format](file_path, collection_name)
+    writer.open()
+    return writer
@@ -1,28 +1,151 @@
 from __future__ import annotations
 import asyncio
+import random
+import time
 from typing import Awaitable, Callable, TypeVar
+import httpx
 
 # Keeps return type from func()
 T = TypeVar("T")
 
-""" 
-Retry an async function with exponential backoff, return result of func() if successful,
-otherwise re raises the last exception
+# Raised instead of calling a host whose circuit breaker is open
+class CircuitOpenError(Exception):
+    pass
+
+# Substrings of tool errors caused by a struggling site or server, anything else (missing selector,
+# ambiguous selector, unknown host, bad params) fails the same way on every attempt
+TRANSIENT_MARKERS = (
+    "timeout", "timed out", "net::err_connection", "net::err_timed_out", "net::err_network_changed",
+    "net::err_empty_response", "net::err_internet_disconnected", "target closed", "has been closed",
+    "session pool exhausted",
+)
+
+"""
+Decides whether exc is worth another attempt.
+- Exceptions with a boolean 'retryable' attribute decide for themselves (StaticFetchError)
+- Connection problems and timeouts talking to the MCP server are retried
+- MCP tool errors are retried only when their message looks transient, see TRANSIENT_MARKERS
+"""
+def is_retryable(exc: BaseException) -> bool:
+    flag = getattr(exc, "retryable", None)
+    if isinstance(flag, bool):
+        return flag
+    if isinstance(exc, CircuitOpenError):
+        return False
+    if isinstance(exc, (httpx.TransportError, asyncio.TimeoutError)):
+        return True
+    message = str(exc).lower()
+    return any(marker in message for marker in TRANSIENT_MARKERS)
+
+# Retries one job may spend over all of its calls, so a failing site can not multiply its load by retries per call
+class RetryBudget:
+    def __init__(self, max_retries: int = 10):
+        self.max_retries = max_retries
+        self.spent = 0
+
+    # Take one retry from the budget, False once it is used up
+    def spend(self) -> bool:
+        if self.spent >= self.max_retries:
+            return False
+        self.spent += 1
+        return True
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.max_retries - self.spent)
+
 """
-async def retry_async(func: Callable[[], Awaitable[T]], retries: int = 3, base_delay: float = 0.5, factor: float = 2.0,) -> T:
+Per host circuit breaker.
+- closed: calls go through, failure_threshold transient failures in a row open the circuit
+- open: calls fail fast with CircuitOpenError for reset_timeout seconds
+- half open: after that one probe call is let through, success closes the circuit, failure opens it again
+Share one breaker between jobs that hit the same sites so they back off together.
+"""
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self._failures: dict[str, int] = {}
+        self._opened_at: dict[str, float] = {}
+        self._probing: set[str] = set()
+
+    def state(self, host: str) -> str:
+        opened_at = self._opened_at.get(host)
+        if opened_at is None:
+            return "closed"
+        if self.clock() - opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    # Raises CircuitOpenError unless a call to host may go ahead, in half open state only the first caller probes
+    def check(self, host: str) -> None:
+        state = self.state(host)
+        if state == "closed":
+            return
+        if state == "half_open" and host not in self._probing:
+            self._probing.add(host)
+            return
+        retry_in = max(0.0, self._opened_at[host] + self.reset_timeout - self.clock())
+        raise CircuitOpenError(f"Circuit open for {host}, retry in {retry_in:.1f}s")
+
+    def record_success(self, host: str) -> None:
+        self._failures.pop(host, None)
+        self._opened_at.pop(host, None)
+        self._probing.discard(host)
+
+    # A probe that ended without an outcome (cancelled) frees the half open slot for the next caller
+    def release(self, host: str) -> None:
+        self._probing.discard(host)
+
+    def record_failure(self, host: str) -> None:
+        self._failures[host] = self._failures.get(host, 0) + 1
+        if host in self._probing or self._failures[host] >= self.failure_threshold:
+            self._opened_at[host] = self.clock()
+            self._probing.discard(host)
+
+    def open_hosts(self) -> list[str]:
+        return [host for host in self._opened_at if self.state(host) != "closed"]
+
+"""
+Retry an async function with full jitter exponential backoff, return result of func() if successful,
+otherwise re raises the last exception.
+- Attempt n sleeps a random time between 0 and min(max_delay, base_delay * factor ** n), so clients
+  that failed together do not retry together
+- Errors that retryable() rejects are raised at once, as is the error that finds the budget used up
+- With a breaker and host, calls to an open host fail fast and transient failures count against it,
+  any other outcome (a result or an error the site is not to blame for) closes the circuit
+- sleep and rand are injectable so the timing can be driven by a fake clock
+"""
+async def retry_async(func: Callable[[], Awaitable[T]], retries: int = 3, base_delay: float = 0.5, factor: float = 2.0,
+                      max_delay: float = 30.0, *, retryable: Callable[[BaseException], bool] = is_retryable,
+                      budget: RetryBudget | None = None, breaker: CircuitBreaker | None = None, host: str | None = None,
+                      sleep: Callable[[float], Awaitable[object]] = asyncio.sleep,
+                      rand: Callable[[], float] = random.random) -> T:
     attempt = 0
-    last_exc: Exception | None = None
-    while attempt <= retries:
+    while True:
+        if breaker is not None and host:
+            breaker.check(host)
+        settled = False
         try:
-            return await func() # Try executing the async function
+            result = await func() # Try executing the async function
         except Exception as e:
-            last_exc = e
-            if attempt == retries:
+            transient = retryable(e)
+            if breaker is not None and host:
+                if transient:
+                    breaker.record_failure(host)
+                else:
+                    breaker.record_success(host)
+            settled = True
+            if not transient or attempt >= retries or (budget is not None and not budget.spend()):
                 raise
-            delay = base_delay * (factor ** attempt)
-            await asyncio.sleep(delay)
-            attempt += 1
-    
-    assert last_exc is not None
-    raise last_exc
-
+        else:
+            if breaker is not None and host:
+                breaker.record_success(host)
+            settled = True
+            return result
+        finally:
+            if not settled and breaker is not None and host:
+                breaker.release(host)
+        await sleep(rand() * min(max_delay, base_delay * (factor ** attempt)))
+        attempt += 1
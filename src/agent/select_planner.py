@@ -1,13 +1,107 @@
 from __future__ import annotations
-from typing import Dict, List, Optional
-from bs4 import BeautifulSoup
+from typing import Any, Dict, List, Optional
 from collections import Counter
+import re
+from .document import ParsedDocument
+from .extractor import caster_for
+from .selector_engine import CompiledPlan, candidate_value
+
+# Item containers sampled to verify field candidates, and verified selectors kept as primary per field
+SAMPLE_ITEMS = 5
+MAX_VERIFIED_SELECTORS = 3
+
+# Words in class names and attributes that point at a field, looked up by each word of the field name
+FIELD_SYNONYMS = {
+    "price": ("price", "cost", "amount"),
+    "cost": ("cost", "price", "amount"),
+    "name": ("name", "title"),
+    "title": ("title", "name", "heading"),
+    "description": ("description", "desc", "summary"),
+    "desc": ("desc", "description", "summary"),
+    "image": ("image", "img", "photo", "picture", "thumbnail"),
+    "photo": ("photo", "image", "img", "picture"),
+    "picture": ("picture", "image", "img", "photo"),
+    "availability": ("availability", "stock", "available"),
+    "stock": ("stock", "availability", "available"),
+    "cpu": ("cpu", "processor"),
+    "processor": ("processor", "cpu"),
+    "ram": ("ram", "memory"),
+    "memory": ("memory", "ram"),
+}
+
+# Field words whose values are image URLs rather than text
+_IMAGE_WORDS = {"image", "img", "photo", "picture", "thumbnail"}
+
+_WORD_SPLIT_RE = re.compile(r"[^a-z0-9]+")
+
+# Class names hinting at a record container, used when the page has no repeated sibling group
+ITEM_KEYWORDS = ("product", "card", "item", "listing", "result", "post", "entry", "record")
+
+# Siblings with the same signature needed before they count as a list of records
+MIN_ITEM_REPEATS = 2
+
+# Tags the keyword fallback looks at, and tags that are never records
+_KEYWORD_ITEM_TAGS = {"div", "li", "article", "section"}
+_NON_ITEM_TAGS = {"head", "script", "style", "template", "noscript", "meta", "link", "option", "br", "hr", "svg"}
+
+# Ancestors searched for a class or id to anchor a group of unclassed records on
+_MAX_ANCHOR_DEPTH = 3
+
+# Class names and ids usable in a selector without escaping, utility classes like "md:w-1/2" are left out
+_CSS_IDENT_RE = re.compile(r"^-?[A-Za-z_][\w-]*$")
 
 # Immutable plan the extractor uses -> an item scope + per field selector fallbacks
 class SelectorPlan:
-    def __init__(self, item_selector: Optional[str], field_selectors: Dict[str, List[str]]):
+    def __init__(self, item_selector: Optional[str], field_selectors: Dict[str, List[str]], fallback_selectors: Optional[Dict[str, List[str]]] = None):
         self.item_selector = item_selector # CSS that identifies one "item"/container
         self.field_selectors = field_selectors # List of CSS selectors - tried in order
+        self.fallback_selectors = fallback_selectors or {} # Only tried for fields the field_selectors missed
+        self._compiled: Dict[str, CompiledPlan] = {}
+    
+    # Selectors compiled once per plan and parser backend, reused for every page extracted with it
+    def compiled(self, backend: str = "bs4") -> CompiledPlan:
+        if backend not in self._compiled:
+            self._compiled[backend] = CompiledPlan(self.item_selector, self.field_selectors, backend=backend, fallback_selectors=self.fallback_selectors)
+        return self._compiled[backend]
+    
+    # Compiled selectors hold parser objects that do not pickle, a plan sent to a worker process recompiles there
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state["_compiled"] = {}
+        return state
+    
+    # Plain dict form used to persist a plan between runs
+    def to_dict(self) -> Dict[str, Any]:
+        return {"item_selector": self.item_selector, "field_selectors": self.field_selectors, "fallback_selectors": self.fallback_selectors}
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> SelectorPlan:
+        return cls(
+            item_selector=data.get("item_selector"),
+            field_selectors=dict(data.get("field_selectors", {})),
+            fallback_selectors=dict(data.get("fallback_selectors", {}))
+        )
+    
+    """
+    Collapse each field to the candidates that produced values, keeping their plan order.
+    hits -> field -> {selector: number of items it supplied}
+    Every other candidate moves to fallback_selectors and is only tried when the winners miss.
+    Fields without any hit keep their full candidate list since nothing was learned about them.
+    """
+    def refined(self, hits: Dict[str, Dict[str, int]]) -> SelectorPlan:
+        field_selectors: Dict[str, List[str]] = {}
+        fallback_selectors: Dict[str, List[str]] = {}
+        for field, selectors in self.field_selectors.items():
+            candidates = list(selectors) + list(self.fallback_selectors.get(field, []))
+            field_hits = hits.get(field, {})
+            winners = [sel for sel in candidates if field_hits.get(sel)]
+            if not winners:
+                field_selectors[field] = list(selectors)
+                fallback_selectors[field] = list(self.fallback_selectors.get(field, []))
+                continue
+            field_selectors[field] = winners
+            fallback_selectors[field] = [sel for sel in candidates if sel not in winners]
+        return SelectorPlan(item_selector=self.item_selector, field_selectors=field_selectors, fallback_selectors=fallback_selectors)
     
     def debug_print(self) -> None:
         print("[SelectorPlan]")
@@ -15,6 +109,8 @@ class SelectorPlan:
         print("    field_selectors:")
         for field, selectors in self.field_selectors.items():
             print(f" {field}: {selectors}")
+            if self.fallback_selectors.get(field):
+                print(f" {field} (fallback): {self.fallback_selectors[field]}")
 
 """
 Builds a SelectorPlan from HTML and expected fields
@@ -22,85 +118,229 @@ Builds a SelectorPlan from HTML and expected fields
 - Produces deduped fallback selectors per field name
 """
 class SelectorPlanner: 
-    def __init__(self, html: str, collection_name: Optional[str], expected_fields: Dict[str, str]):
-        self.html = html
+    def __init__(self, html: str | ParsedDocument, collection_name: Optional[str], expected_fields: Dict[str, str], backend: str = "bs4"):
+        self.document = ParsedDocument.of(html, backend=backend)
+        self.backend = self.document.backend
+        self.html = self.document.html
         self.collection_name = collection_name
         self.expected_fields = expected_fields
-        self.soup = BeautifulSoup(self.html, "lxml")
 
-    # Main entry -> infer item container and per field selector candidates
+    """
+    Main entry -> infer item container and per field selectors checked against the page.
+    Candidates from the field name plus selectors of nodes inside sampled items whose classes or
+    attributes mention the field are tried on the samples. The ones that produce a value of the
+    field's type become the field's selectors, the name guesses that did not go to the fallbacks.
+    Fields nothing was verified for keep every name guess, as nothing was learned about them.
+    """
     def build_plan(self) -> SelectorPlan:
         item_selector = self._find_reapeated_item_selector()
+        samples = self._sample_items(item_selector)
+        node_selectors = self._node_selectors(samples)
 
         field_selectors: Dict[str, List[str]] = {}
-        for field_name in self.expected_fields.keys():
-            finds = self._find_field_selectors(field_name=field_name)
-            field_selectors[field_name] = finds
+        fallback_selectors: Dict[str, List[str]] = {}
+        for field_name, field_type in self.expected_fields.items():
+            guesses = self._find_field_selectors(field_name=field_name)
+            words = self._field_words(field_name)
+            discovered = [sel for sel, node_words in node_selectors.items() if node_words & words and sel not in guesses]
+
+            verified = self._verify_candidates(guesses + discovered, field_type, samples, image=bool(words & _IMAGE_WORDS))
+            if not verified:
+                field_selectors[field_name] = guesses
+                continue
+            field_selectors[field_name] = verified
+            fallback_selectors[field_name] = [sel for sel in guesses if sel not in verified]
         
-        return SelectorPlan(item_selector=item_selector, field_selectors=field_selectors)
+        return SelectorPlan(item_selector=item_selector, field_selectors=field_selectors, fallback_selectors=fallback_selectors)
+
+    # Up to SAMPLE_ITEMS item containers spread over the page, the document root without an item selector
+    def _sample_items(self, item_selector: Optional[str]) -> List[Any]:
+        containers = self.document.select(item_selector) if item_selector else []
+        if not containers:
+            return [self.document.root]
+        step = max(1, len(containers) // SAMPLE_ITEMS)
+        return containers[::step][:SAMPLE_ITEMS]
+
+    # Words of the field name's last segment plus their synonyms
+    def _field_words(self, field_name: str) -> set:
+        words = set()
+        for word in _WORD_SPLIT_RE.split(field_name.split(".")[-1].lower()):
+            if word:
+                words.add(word)
+                words.update(FIELD_SYNONYMS.get(word, ()))
+        return words
+
+    # selector -> words it was derived from, for every class, data-* attribute and itemprop inside the samples
+    def _node_selectors(self, samples: List[Any]) -> Dict[str, set]:
+        backend = self.backend
+        found: Dict[str, set] = {}
+        for scope in samples:
+            for el in backend.iter_elements(scope):
+                for cls in backend.classes(el):
+                    if "." + cls not in found and _CSS_IDENT_RE.match(cls):
+                        found["." + cls] = set(_WORD_SPLIT_RE.split(cls.lower()))
+                for name, value in backend.attrs(el).items():
+                    if name.startswith("data-") and _CSS_IDENT_RE.match(name):
+                        found.setdefault(f"[{name}]", set(_WORD_SPLIT_RE.split(name[5:].lower())))
+                    elif name == "itemprop" and value and _CSS_IDENT_RE.match(value):
+                        found.setdefault(f"[itemprop='{value}']", set(_WORD_SPLIT_RE.split(value.lower())))
+        return found
+
+    """
+    Candidates whose first match in a sampled item gives a value of field_type, image fields also
+    need a URL like value. At most MAX_VERIFIED_SELECTORS of them, those hitting the most samples,
+    returned in candidate order since the extractor takes the first candidate with a value.
+    """
+    def _verify_candidates(self, candidates: List[str], field_type: str, samples: List[Any], image: bool = False) -> List[str]:
+        backend = self.backend
+        cast = caster_for(field_type)
+        hits: Dict[str, int] = {}
+        for sel in candidates:
+            compiled = backend.compile(sel)
+            if compiled is None:
+                continue
+            count = 0
+            for scope in samples:
+                found = backend.select(scope, compiled)
+                value = candidate_value(backend, found[0]) if found else None
+                if value is None or cast(value) is None:
+                    continue
+                if image and (" " in value or not any(ch in value for ch in "/.")):
+                    continue
+                count += 1
+            if count:
+                hits[sel] = count
+        best = sorted(hits, key=lambda sel: -hits[sel])[:MAX_VERIFIED_SELECTORS]
+        return [sel for sel in candidates if sel in best]
     
     """
-    Try to detect a list container by attributes/classes commonly used for cards/rsults
-    Returns the most frequent selector observed, or None if no strong candidate
+    Detect the repeated record container in one pass over the tree, linear in its size.
+    - Children of the same parent are grouped by signature: tag + class set, data-ids and other per record
+      attributes are ignored so they no longer keep records apart
+    - Each element gets a shape hash of its signature and the distinct shapes below it, and a
+      variety: how many distinct shapes its subtree holds, repeated children counted once
+    - A group scores members * (variety - 1), scaled by how many members share the dominant
+      shape. Groups with the same selector under different parents (cards split over rows)
+      add up, so records beat navigation lists of bare links and rows of records
+    - Groups inside the members of another group are fields of those records (spec rows of a card)
+      and left out, unless the enclosing members hold nothing else (grid rows of cards)
+    - Without any repeated group (e.g. a page with a single card) the most frequent class chain
+      with a keyword like "product" or "card" is used, as before
     """
     def _find_reapeated_item_selector(self) -> Optional[str]:
-        keywords = ["product", "card", "item", "listing", "result", "post", "entry", "record"]
-        candidates = []
-
-        # Strong signals: data-testid/data-id
-        for div in self.soup.select("div[data-testid], div[data-id]"):
-            classes = div.get("class", [])
-            data_testid = div.get("data-testid", "")
-
-            if classes or data_testid:
-                sel = self._element_to_selector(div)
-                if sel:
-                    candidates.append(sel)
-        
-        # Keyword based classes
-        for div in self.soup.select("div[class]"):
-            class_list = div.get("class", [])
-            if not class_list:
-                continue
+        backend = self.backend
+        elements = [self.document.root]
+        kids: List[List[int]] = []
+        parents: List[int] = [-1]
+        signatures: List[tuple] = []
+        class_lists: List[List[str]] = [] # Usable classes in document order, the selector keeps that order
+        keyword_candidates: Counter = Counter()
 
-            joined = " ".join(class_list).lower()
+        # Pre-order walk, every element is visited once and indexed by its position
+        i = 0
+        while i < len(elements):
+            el = elements[i]
+            classes = [c for c in backend.classes(el) if _CSS_IDENT_RE.match(c)]
+            class_lists.append(classes)
+            signatures.append((backend.tag(el), frozenset(classes)))
+            children = backend.children(el)
+            kids.append(list(range(len(elements), len(elements) + len(children))))
+            elements.extend(children)
+            parents.extend([i] * len(children))
+            if classes and signatures[i][0] in _KEYWORD_ITEM_TAGS:
+                joined = " ".join(classes).lower()
+                if any(kw in joined for kw in ITEM_KEYWORDS):
+                    keyword_candidates["." + ".".join(backend.classes(el))] += 1
+            i += 1
 
-            if any(kw in joined for kw in keywords):
-                sel = self._element_to_selector(div)
-                if sel:
-                    candidates.append(sel)
-        
-        # Other common item like containers
-        for el in self.soup.select("li[class], article[class], section.item, div.item"):
-            sel = self._element_to_selector(el)
-            if sel:
-                candidates.append(sel)
-        
-        # Choose the most frequently occuring candidate
-        if candidates:
-            counts = Counter(candidates)
-            most_common = counts.most_common(1)[0][0]
-            return most_common
-        
+        # Children come after their parent, so walking backwards computes subtrees bottom up
+        shapes: List[int] = [0] * len(elements)
+        variety: List[int] = [0] * len(elements)
+        for i in range(len(elements) - 1, -1, -1):
+            distinct: Dict[int, int] = {}
+            for k in kids[i]:
+                distinct.setdefault(shapes[k], variety[k])
+            shapes[i] = hash((signatures[i], frozenset(distinct)))
+            variety[i] = 1 + sum(distinct.values())
+
+        found: List[tuple] = [] # (parent, members, selector, score)
+        member_of: Dict[int, str] = {} # Member of a repeated group -> the group's selector
+        for i, children in enumerate(kids):
+            groups: Dict[tuple, List[int]] = {}
+            for k in children:
+                if signatures[k][0] not in _NON_ITEM_TAGS:
+                    groups.setdefault(signatures[k], []).append(k)
+            for signature, members in groups.items():
+                if len(members) < MIN_ITEM_REPEATS:
+                    continue
+                richness = sum(variety[k] for k in members) / len(members) - 1
+                if richness <= 0:
+                    continue
+                ancestors = []
+                a = i
+                while a >= 0 and len(ancestors) < _MAX_ANCHOR_DEPTH:
+                    ancestors.append((elements[a], class_lists[a]))
+                    a = parents[a]
+                selector = self._group_selector([elements[k] for k in members], class_lists[members[0]], ancestors)
+                if selector is None:
+                    continue
+                consistency = Counter(shapes[k] for k in members).most_common(1)[0][1] / len(members)
+                found.append((i, members, selector, len(members) * richness * (0.5 + 0.5 * consistency)))
+                member_of.update((k, selector) for k in members)
+
+        scores: Counter = Counter()
+        for i, members, selector, score in found:
+            if not self._is_sub_record_group(i, members[0], selector, kids, parents, signatures, member_of):
+                scores[selector] += score
+
+        if scores:
+            return scores.most_common(1)[0][0]
+        if keyword_candidates:
+            return keyword_candidates.most_common(1)[0][0]
         return None
-    
-    # Build a stable selector preference: data-testid > data-id > class chain > id
-    def _element_to_selector(self, el) -> Optional[str]:
-        if el.has_attr("data-testid"):
-            return f"[data-testid='{el['data-testid']}']"
 
-        if el.has_attr("data-id"):
-            return f"[data-id='{el['data-id']}']"
-        
-        classes = el.get("class", [])
+    """
+    CSS for a sibling group: data-testid shared by all members > class chain > child path from the
+    nearest ancestor with classes or an id, e.g. "#results > tbody > tr". ancestors -> (element, classes)
+    from the parent upwards.
+    """
+    def _group_selector(self, members: List[Any], classes: List[str], ancestors: List[tuple]) -> Optional[str]:
+        attr = self.backend.get_attr
+        testids = {attr(el, "data-testid") for el in members}
+        if len(testids) == 1 and None not in testids:
+            return f"[data-testid='{testids.pop()}']"
         if classes:
             return "." + ".".join(classes)
-        
-        if el.has_attr("id"):
-            return f"#{el['id']}"
-        
+
+        path = [self.backend.tag(members[0])]
+        for el, el_classes in ancestors:
+            if el_classes:
+                return " > ".join(["." + ".".join(el_classes), *reversed(path)])
+            el_id = attr(el, "id")
+            if el_id and _CSS_IDENT_RE.match(el_id):
+                return " > ".join([f"#{el_id}", *reversed(path)])
+            path.append(self.backend.tag(el))
         return None
     
+    """
+    True when the group with parent and first member sits inside a member of another repeated group
+    that holds more than the path down to it, e.g. li.spec rows under the ul of a .product-card.
+    A grid row whose only content is cards (or wrappers of cards) does not make the cards sub-records.
+    """
+    def _is_sub_record_group(self, parent: int, member: int, selector: str, kids: List[List[int]], parents: List[int],
+                             signatures: List[tuple], member_of: Dict[int, str]) -> bool:
+        side_content = False
+        a, child = parent, member
+        while a >= 0:
+            side_content = side_content or any(
+                signatures[k] != signatures[child] and signatures[k][0] not in _NON_ITEM_TAGS for k in kids[a]
+            )
+            enclosing = member_of.get(a)
+            if enclosing is not None and enclosing != selector:
+                return side_content
+            a, child = parents[a], a
+        return False
+    
     # Generate fallback selectors for a field name
     def _find_field_selectors(self, field_name: str) -> List[str]:
         last_segment = field_name.split(".")[-1].lower()
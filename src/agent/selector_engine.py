@@ -0,0 +1,209 @@
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import re
+from .parser_backends import get_backend
+
+# Pieces of a compound selector used to derive its anchor
+_IDENT = r"-?[_a-zA-Z][_a-zA-Z0-9-]*"
+_ATTR_NAME_RE = re.compile(r"\[\s*(" + _IDENT + r")")
+_PARENS_RE = re.compile(r"\([^)]*\)")
+_BRACKETS_RE = re.compile(r"\[[^\]]*\]")
+_CLASS_RE = re.compile(r"\.(" + _IDENT + r")")
+_ID_RE = re.compile(r"#(" + _IDENT + r")")
+_TAG_RE = re.compile(r"[a-zA-Z][a-zA-Z0-9-]*")
+
+# Extract the most relevant textual or attribute value from a given element
+def candidate_value(backend, el) -> Optional[str]:
+    if el is None:
+        return None
+
+    tag = backend.tag(el)
+    if tag == "img":
+        src = backend.get_attr(el, "src")
+        if src is not None:
+            src = src.strip()
+            return src if src else None
+    if tag == "a":
+        href = backend.get_attr(el, "href")
+        if href is not None:
+            href = href.strip()
+            return href if href else None
+
+    text = backend.text(el)
+    return text if text else None
+
+# Rightmost compound of a selector ("ul.specs li[data-cpu]" -> "li[data-cpu]"), None for selector lists
+def _rightmost_compound(css: str) -> Optional[str]:
+    depth = 0
+    quote: Optional[str] = None
+    boundary = -1
+    for pos, ch in enumerate(css):
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in "'\"":
+            quote = ch
+        elif ch in "[(":
+            depth += 1
+        elif ch in "])":
+            depth -= 1
+        elif depth == 0 and ch == ",":
+            return None
+        elif depth == 0 and (ch.isspace() or ch in ">+~"):
+            boundary = pos
+    return css[boundary + 1:].strip() or None
+
+"""
+Cheapest necessary condition for an element to match the selector:
+".cls" -> element has the class, "[attr" -> element has the attribute, "tag" -> element name.
+Returns None when no safe anchor can be derived, those selectors are tested on every element.
+"""
+def _anchor_key(css: str) -> Optional[str]:
+    if "\\" in css:
+        return None
+    compound = _rightmost_compound(css.strip())
+    if compound is None:
+        return None
+
+    # Anything inside :not(...)/:is(...) may be negated or optional, never anchor on it
+    compound = _PARENS_RE.sub("", compound)
+    attrs = _ATTR_NAME_RE.findall(compound)
+    bare = _BRACKETS_RE.sub("", compound)
+    if any(ch in bare for ch in "[]()"):
+        return None
+
+    classes = _CLASS_RE.findall(bare)
+    if classes:
+        return "." + classes[0]
+    ids = _ID_RE.findall(bare)
+    if ids or attrs:
+        return "[" + (attrs[0] if attrs else "id").lower()
+    tag = _TAG_RE.match(bare)
+    if tag:
+        return tag.group(0).lower()
+    return None
+
+# One ordered candidate list per field, indexed by anchor key
+class _CandidateTier:
+    def __init__(self, backend, field_selectors: Dict[str, List[str]], discarded: List[str]):
+        self.fields: Dict[str, List[Tuple[str, Any]]] = {}
+        for field_name, selectors in field_selectors.items():
+            compiled: List[Tuple[str, Any]] = []
+            for sel in selectors:
+                matcher = backend.compile(sel)
+                if matcher is None:
+                    discarded.append(sel)
+                    continue
+                compiled.append((sel, matcher))
+            self.fields[field_name] = compiled
+
+        # anchor key -> [(field position, candidate index)]
+        self.field_names = list(self.fields.keys())
+        self.index: Dict[str, List[Tuple[int, int]]] = {}
+        self.unanchored: List[Tuple[int, int]] = []
+        for f, field_name in enumerate(self.field_names):
+            for i, (sel, _) in enumerate(self.fields[field_name]):
+                key = _anchor_key(sel)
+                if key is None:
+                    self.unanchored.append((f, i))
+                else:
+                    self.index.setdefault(key, []).append((f, i))
+
+    """
+    Single pass over the container's descendants in document order.
+    Matches select_one() semantics per candidate: a candidate only ever sees its
+    first matching element, and the lowest index candidate with a value wins.
+    """
+    def walk(self, backend, scope, matchers: _BoundMatchers, results: Dict[str, Tuple[Optional[str], Optional[str]]], only: Optional[set] = None) -> None:
+        names = self.field_names
+        candidates = [self.fields[name] for name in names]
+        # Lowest candidate index that produced a value so far, fields outside `only` start resolved
+        best = [len(c) if only is None or name in only else 0 for name, c in zip(names, candidates)]
+        values: List[Optional[str]] = [None] * len(names)
+        seen: List[set] = [set() for _ in names] # Candidates whose first match was already consumed
+        remaining = sum(1 for b in best if b > 0)
+        index = self.index
+
+        for el in backend.iter_elements(scope):
+            if not remaining:
+                break
+
+            hits = list(self.unanchored)
+            for key in backend.element_keys(el):
+                found = index.get(key)
+                if found:
+                    hits.extend(found)
+
+            for f, i in hits:
+                if i >= best[f] or i in seen[f]:
+                    continue
+                sel, compiled = candidates[f][i]
+                if not matchers.get(compiled)(el):
+                    continue
+                seen[f].add(i)
+                value = candidate_value(backend, el)
+                if value:
+                    best[f] = i
+                    values[f] = value
+                    if i == 0:
+                        remaining -= 1
+
+        for f, name in enumerate(names):
+            if values[f] is not None:
+                results[name] = (values[f], candidates[f][best[f]][0])
+
+"""
+SelectorPlan with every CSS string compiled once.
+- Invalid selectors are dropped at compile time instead of failing per container
+- Candidates are indexed by an anchor (class, attribute or tag) so each element is
+  only tested against the few candidates it could possibly match
+- first_values() walks a container once and evaluates all fields' candidates together,
+  fallback candidates are only walked for the fields the primary candidates missed
+"""
+class CompiledPlan:
+    def __init__(self, item_selector: Optional[str], field_selectors: Dict[str, List[str]], backend: str = "bs4", fallback_selectors: Optional[Dict[str, List[str]]] = None):
+        self.backend = get_backend(backend)
+        self.item_selector = self.backend.compile(item_selector) if item_selector else None
+        self.discarded: List[str] = []
+        self._primary = _CandidateTier(self.backend, field_selectors, self.discarded)
+        fallbacks = {field: sels for field, sels in (fallback_selectors or {}).items() if sels}
+        self._fallback = _CandidateTier(self.backend, fallbacks, self.discarded) if fallbacks else None
+        self.fields = self._primary.fields
+
+    # Item containers of a parsed page, the whole document when no item selector exists
+    def containers(self, root) -> list:
+        if self.item_selector is None:
+            return [root]
+        return self.backend.select(root, self.item_selector)
+
+    # Per document match functions, created lazily the first time a candidate is tested
+    def bind(self, root) -> _BoundMatchers:
+        return _BoundMatchers(self.backend, root)
+
+    # Returns field -> (raw value, winning selector), both None when nothing matched
+    def first_values(self, scope, matchers: Optional[_BoundMatchers] = None) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+        matchers = matchers or self.bind(scope)
+        results: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        self._primary.walk(self.backend, scope, matchers, results)
+
+        if self._fallback is not None:
+            missed = {name for name in self._fallback.field_names if name not in results}
+            if missed:
+                self._fallback.walk(self.backend, scope, matchers, results, only=missed)
+
+        for name in self.fields:
+            results.setdefault(name, (None, None))
+        return results
+
+class _BoundMatchers:
+    def __init__(self, backend, root):
+        self._backend = backend
+        self._root = root
+        self._cache: Dict[int, Callable[[Any], bool]] = {}
+
+    def get(self, compiled) -> Callable[[Any], bool]:
+        fn = self._cache.get(id(compiled))
+        if fn is None:
+            fn = self._backend.matcher(compiled, self._root)
+            self._cache[id(compiled)] = fn
+        return fn
@@ -0,0 +1,79 @@
+from __future__ import annotations
+from typing import Dict, Optional
+import httpx
+
+# Statuses a retry may fix, every other 4xx/5xx fails the same way again
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+# Raised when a page can not be fetched without the browser, retryable tells the retry policy whether trying again can help
+class StaticFetchError(Exception):
+    def __init__(self, message: str, retryable: bool = False):
+        super().__init__(message)
+        self.retryable = retryable
+
+# Sent instead of httpx's default user agent, some sites serve bots a different page
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/130.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+"""
+Plain HTTP page fetcher for server rendered sites, no JavaScript is executed.
+One pooled httpx client per fetcher so keep-alive connections are reused across pages.
+"""
+class StaticFetcher:
+    def __init__(self, timeout: float = 15.0, max_connections: int = 20):
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def start(self) -> None:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                follow_redirects=True,
+                headers=DEFAULT_HEADERS,
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+            )
+
+    async def stop(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+
+    """
+    Returns (final url after redirects, decoded html, validators).
+    validators -> {"etag", "last_modified"} of the response, only the ones the server sent.
+    Passing the validators of an earlier response makes the request conditional, html is None
+    when the server answers 304 Not Modified.
+    """
+    async def fetch(self, url: str, validators: Optional[Dict[str, str]] = None) -> tuple[str, Optional[str], Dict[str, str]]:
+        await self.start()
+        assert self._client is not None
+        headers = {}
+        if validators and validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators and validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+        try:
+            response = await self._client.get(url, headers=headers)
+        except httpx.HTTPError as e:
+            raise StaticFetchError(f"GET {url} failed: {e}", retryable=isinstance(e, httpx.TransportError)) from e
+
+        fresh = {}
+        if response.headers.get("etag"):
+            fresh["etag"] = response.headers["etag"]
+        if response.headers.get("last-modified"):
+            fresh["last_modified"] = response.headers["last-modified"]
+        if response.status_code == 304 and headers:
+            return str(response.url), None, fresh or dict(validators)
+
+        if response.status_code >= 400:
+            raise StaticFetchError(f"GET {url} returned HTTP {response.status_code}",
+                                   retryable=response.status_code in RETRYABLE_STATUSES)
+        content_type = response.headers.get("content-type", "")
+        if content_type and "html" not in content_type and "xml" not in content_type:
+            raise StaticFetchError(f"GET {url} returned {content_type}, not HTML")
+
+        return str(response.url), response.text, fresh
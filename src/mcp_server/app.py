@@ -1,26 +1,57 @@
+import os
+import zlib
 from loguru import logger
-from .browser import BrowserManager
-from .tools import Tools
+from .browser import BrowserManager, SessionPool, SessionPoolError
+from .html_dumps import HtmlDumper
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
-from .schemas import ToolResponse, ListResponse, CallRequest
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from .schemas import ToolResponse, ListResponse, CallRequest, SessionRequest, BatchRequest, BatchResponse
+
+try:
+    import zstandard
+except ImportError: # zstd is optional, gzip is always available
+    zstandard = None
 
 # Supported MCP tools exposed to the agent
-TOOLS = ["navigate", "screenshot", "extract_links", "fill_field", "click", "html", "scroll", "current_url"]
+TOOLS = ["navigate", "screenshot", "extract_links", "fill_field", "click", "html", "scroll", "current_url", "wait", "wait_for", "extract", "block_resources", "resource_stats"]
+
+# Session pool sizing, overridable per deployment through the environment
+POOL_MIN_SIZE = int(os.getenv("MCP_POOL_MIN_SIZE", "1"))
+POOL_MAX_SIZE = int(os.getenv("MCP_POOL_MAX_SIZE", "16"))
+SESSION_IDLE_TIMEOUT = float(os.getenv("MCP_SESSION_IDLE_TIMEOUT", "300"))
+
+# HTML debug dumps: off | always | sample | error, bounded by file count and total size
+HTML_DUMP_MODE = os.getenv("MCP_HTML_DUMP", "off")
+HTML_DUMP_SAMPLE_RATE = float(os.getenv("MCP_HTML_DUMP_SAMPLE_RATE", "0.1"))
+HTML_DUMP_MAX_MB = float(os.getenv("MCP_HTML_DUMP_MAX_MB", "200"))
+HTML_DUMP_MAX_FILES = int(os.getenv("MCP_HTML_DUMP_MAX_FILES", "500"))
+
+dumper = HtmlDumper(
+    mode=HTML_DUMP_MODE,
+    sample_rate=HTML_DUMP_SAMPLE_RATE,
+    max_bytes=int(HTML_DUMP_MAX_MB * 1024 * 1024),
+    max_files=HTML_DUMP_MAX_FILES,
+)
 
-# Single shared browser session managed by Playwright
-browser = BrowserManager(headless=True)
-tools: Tools | None = None
+# Resource types / URL patterns blocked on every session unless a job reconfigures it, comma separated
+BLOCK_RESOURCES = [t.strip() for t in os.getenv("MCP_BLOCK_RESOURCES", "").split(",") if t.strip()]
+BLOCK_URLS = [u.strip() for u in os.getenv("MCP_BLOCK_URLS", "").split(",") if u.strip()]
+
+# One Playwright browser process, isolated sessions are leased from the pool
+browser = BrowserManager(headless=True, block_resources=BLOCK_RESOURCES, block_urls=BLOCK_URLS)
+pool = SessionPool(browser, min_size=POOL_MIN_SIZE, max_size=POOL_MAX_SIZE, idle_timeout=SESSION_IDLE_TIMEOUT, dumper=dumper)
 
 # FastApi lifespan hook to handel startup/shutdown
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await browser.start()
-    global tools
-    tools = Tools(browser.page)
+    await pool.start()
     try: yield
-    finally: 
+    finally:
+        await pool.stop()
         await browser.stop()
+        await dumper.flush()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -36,24 +67,146 @@ async def mcp_initialize():
 async def get_mcp_tools():
     return ToolResponse(ok=True, data={"tools": TOOLS})
 
+# Session endpoints -> lease an isolated browser context per scrape job
+@app.post("/mcp/sessions/open", response_model=ToolResponse)
+async def open_session(req: SessionRequest):
+    try:
+        session = await pool.open(req.session_id)
+        logger.info(f"SESSION opened id={session.session_id}")
+        return ToolResponse(ok=True, data={"session_id": session.session_id})
+    except SessionPoolError as e:
+        logger.warning(str(e))
+        return ToolResponse(ok=False, error=str(e))
+
+@app.post("/mcp/sessions/close", response_model=ToolResponse)
+async def close_session(req: SessionRequest):
+    if not req.session_id:
+        return ToolResponse(ok=False, error="session_id is required")
+    closed = await pool.close(req.session_id)
+    logger.info(f"SESSION closed id={req.session_id} closed={closed}")
+    return ToolResponse(ok=True, data={"session_id": req.session_id, "closed": closed})
+
+@app.get("/mcp/sessions/list", response_model=ToolResponse)
+async def list_sessions():
+    return ToolResponse(ok=True, data=pool.stats())
+
+# Runs one tool on a leased session, unknown tools and handler crashes become failed responses
+async def _run_tool(session, tool: str, params: dict) -> ToolResponse:
+    if tool not in TOOLS:
+        logger.warning(f"Unknown tool requested: {tool}")
+        return ToolResponse(ok=False, error=f"Unknown tool: {tool}")
+
+    try:
+        handler = getattr(session.tools, tool)
+        result: ToolResponse = await handler(**params)
+        logger.info(f"RESULT tool={tool} ok={result.ok}")
+
+    except Exception as e:
+        logger.exception(f"Unhandled error in tool '{tool}'")
+        result = ToolResponse(ok=False, error=f"Unhandled error in tool '{tool}': {str(e)}")
+
+    if not result.ok:
+        await session.tools.dump_on_error(tool)
+    return result
+
 # Core endpoint -> executes a requested MCP tool
 @app.post("/mcp/tools/call", response_model=ToolResponse)
 async def call_tool(req: CallRequest):
-    logger.info(f"CALL tool={req.tool} params={req.params}")
+    logger.info(f"CALL tool={req.tool} session={req.session_id} params={req.params}")
 
-    # Validate tool existence
+    # Validate tool existence before leasing a session
     if req.tool not in TOOLS:
         logger.warning(f"Unknown tool requested: {req.tool}")
         return ToolResponse(ok=False, error=f"Unknown tool: {req.tool}")
-    
-    assert tools is not None
-    handler = getattr(tools, req.tool)
-    
-    try: 
-        result: ToolResponse = await handler(**req.params)
-        logger.info(f"RESULT tool={req.tool} ok={result.ok}")
+
+    try:
+        async with pool.lease(req.session_id) as session:
+            return await _run_tool(session, req.tool, req.params)
+
+    except SessionPoolError as e:
+        logger.warning(str(e))
+        return ToolResponse(ok=False, error=str(e))
+
+"""
+Batch endpoint -> executes an ordered list of tool calls on one session in a single round trip,
+e.g. navigate + interactions + html for one page. The session stays leased for the whole batch
+so no other request can move the page in between. With stop_on_error the batch ends at the
+first failed call and its error is reported as the batch error.
+"""
+@app.post("/mcp/tools/batch", response_model=BatchResponse)
+async def call_batch(req: BatchRequest):
+    logger.info(f"BATCH tools={[c.tool for c in req.calls]} session={req.session_id}")
+
+    results: list[ToolResponse] = []
+    error = None
+    try:
+        async with pool.lease(req.session_id) as session:
+            for call in req.calls:
+                result = await _run_tool(session, call.tool, call.params)
+                results.append(result)
+                if not result.ok:
+                    error = error or f"{call.tool} failed: {result.error}"
+                    if req.stop_on_error:
+                        break
+
+    except SessionPoolError as e:
+        logger.warning(str(e))
+        return BatchResponse(ok=False, results=results, error=str(e))
+
+    return BatchResponse(ok=error is None, results=results, error=error)
+
+# Chunk size of the streamed HTML body
+HTML_STREAM_CHUNK = 64 * 1024
+
+# Best content encoding the client accepts: zstd, gzip or none
+def _pick_encoding(accept_encoding: str) -> str | None:
+    accepted = {part.split(";")[0].strip().lower() for part in accept_encoding.split(",")}
+    if "zstd" in accepted and zstandard is not None:
+        return "zstd"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+def _encode_chunks(body: bytes, encoding: str | None):
+    if encoding == "zstd":
+        compressor = zstandard.ZstdCompressor(level=3).compressobj()
+        compress, flush = compressor.compress, compressor.flush
+    elif encoding == "gzip":
+        compressor = zlib.compressobj(5, zlib.DEFLATED, 31) # wbits 31 -> gzip container
+        compress, flush = compressor.compress, compressor.flush
+    else:
+        compress, flush = (lambda chunk: chunk), (lambda: b"")
+
+    for start in range(0, len(body), HTML_STREAM_CHUNK):
+        out = compress(body[start:start + HTML_STREAM_CHUNK])
+        if out:
+            yield out
+    tail = flush()
+    if tail:
+        yield tail
+
+"""
+Raw HTML endpoint -> the rendered markup of a session as a streamed text/html body instead of
+a JSON escaped string, compressed with zstd or gzip when the client accepts it. The session is
+only leased while the markup is read, errors come back as a regular JSON ToolResponse.
+"""
+@app.post("/mcp/tools/html/stream")
+async def stream_html(req: SessionRequest, request: Request):
+    logger.info(f"HTML stream session={req.session_id}")
+    try:
+        async with pool.lease(req.session_id) as session:
+            result = await _run_tool(session, "html", {})
+            page_url = session.page.url
+    except SessionPoolError as e:
+        logger.warning(str(e))
+        return ToolResponse(ok=False, error=str(e))
+
+    if not result.ok:
         return result
-    
-    except Exception as e:
-        logger.exception(f"Unhandled error in tool '{req.tool}'")
-        return ToolResponse(ok=False, error=f"Unhandled error in tool '{req.tool}': {str(e)}")
+
+    body = result.data["html"].encode("utf-8")
+    encoding = _pick_encoding(request.headers.get("accept-encoding", ""))
+    headers = {"X-Page-URL": page_url}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return StreamingResponse(_encode_chunks(body, encoding), media_type="text/html; charset=utf-8", headers=headers)
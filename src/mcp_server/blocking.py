@@ -0,0 +1,106 @@
+import fnmatch
+import re
+from loguru import logger
+
+# Playwright resource types worth blocking when only the DOM is read
+RESOURCE_TYPES = {"document", "stylesheet", "image", "media", "font", "script", "texttrack", "xhr", "fetch",
+                  "eventsource", "websocket", "manifest", "other"}
+
+# Compile URL patterns into one regex, globs ("*://*.doubleclick.net/*") or plain substrings ("google-analytics.com")
+def _compile_patterns(patterns: list[str]) -> re.Pattern | None:
+    parts = []
+    for pattern in patterns:
+        pattern = pattern.strip()
+        if not pattern:
+            continue
+        if any(ch in pattern for ch in "*?["):
+            parts.append(fnmatch.translate(pattern))
+        else:
+            parts.append(".*" + re.escape(pattern))
+    return re.compile("|".join(f"(?:{p})" for p in parts), re.IGNORECASE) if parts else None
+
+"""
+Request interception for one browser context.
+- Requests of a blocked resource type or matching a blocked URL pattern are aborted before they are sent
+- The route handler is only installed while something is blocked, unblocked contexts pay nothing
+- Counts blocked requests per type and the requests/bytes that were still loaded, blocked bytes are
+  never fetched so the saving shows as the drop in loaded_bytes
+"""
+class ResourceBlocker:
+    def __init__(self, resource_types: list[str] | None = None, url_patterns: list[str] | None = None):
+        self.resource_types: set[str] = set()
+        self.url_patterns: list[str] = []
+        self._url_re: re.Pattern | None = None
+        self._ctx = None
+        self._routed = False
+        self.reset_stats()
+        self._set(resource_types or [], url_patterns or [])
+
+    def _set(self, resource_types: list[str], url_patterns: list[str]) -> None:
+        unknown = set(resource_types) - RESOURCE_TYPES
+        if unknown:
+            raise ValueError(f"Unknown resource types {sorted(unknown)}, expected some of {sorted(RESOURCE_TYPES)}")
+        self.resource_types = set(resource_types)
+        self.url_patterns = list(url_patterns)
+        self._url_re = _compile_patterns(self.url_patterns)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.resource_types or self._url_re)
+
+    def should_block(self, resource_type: str, url: str) -> bool:
+        if resource_type in self.resource_types:
+            return True
+        return self._url_re is not None and self._url_re.match(url) is not None
+
+    # Bind to a context, the response listener counts loaded traffic from then on
+    async def attach(self, ctx) -> None:
+        self._ctx = ctx
+        ctx.on("response", self._on_response)
+        await self._sync_route()
+
+    # Replace what is blocked, stats keep accumulating
+    async def configure(self, resource_types: list[str], url_patterns: list[str]) -> None:
+        self._set(resource_types, url_patterns)
+        await self._sync_route()
+
+    async def _sync_route(self) -> None:
+        if self._ctx is None or self.enabled == self._routed:
+            return
+        if self.enabled:
+            await self._ctx.route("**/*", self._handle)
+        else:
+            await self._ctx.unroute("**/*", self._handle)
+        self._routed = self.enabled
+
+    async def _handle(self, route) -> None:
+        request = route.request
+        if self.should_block(request.resource_type, request.url):
+            self.blocked_requests += 1
+            self.blocked_by_type[request.resource_type] = self.blocked_by_type.get(request.resource_type, 0) + 1
+            try:
+                await route.abort("blockedbyclient")
+            except Exception as e:
+                logger.debug(f"Abort failed for {request.url}: {e}")
+            return
+        await route.continue_()
+
+    def _on_response(self, response) -> None:
+        self.loaded_requests += 1
+        length = response.headers.get("content-length")
+        if length and length.isdigit():
+            self.loaded_bytes += int(length)
+
+    def reset_stats(self) -> None:
+        self.blocked_requests = 0
+        self.blocked_by_type: dict[str, int] = {}
+        self.loaded_requests = 0
+        self.loaded_bytes = 0
+
+    def stats(self) -> dict:
+        return {
+            "blocked_requests": self.blocked_requests,
+            "blocked_by_type": dict(self.blocked_by_type),
+            "loaded_requests": self.loaded_requests,
+            "loaded_bytes": self.loaded_bytes,
+        }
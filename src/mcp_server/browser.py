@@ -1,26 +1,207 @@
+import asyncio
+import time
+import uuid
+from contextlib import asynccontextmanager
 from playwright.async_api import async_playwright, Page, Browser, BrowserContext
+from .tools import Tools
+from .html_dumps import HtmlDumper
+from .blocking import ResourceBlocker
+
+# Session id used when a request does not lease its own session
+DEFAULT_SESSION_ID = "default"
+
+# Raised when a session can not be leased from the pool
+class SessionPoolError(Exception):
+    pass
 
 # Handles Playwright browser lifecycle for the MCP server
-class BrowserManager: 
-    def __init__(self, headless: bool = True):
+class BrowserManager:
+    def __init__(self, headless: bool = True, block_resources: list[str] | None = None, block_urls: list[str] | None = None):
         self._pw = None # Playwright driver instance
         self.browser: Browser | None = None # Chromium browser instance
-        self.ctx: BrowserContext | None = None # Isolated browser context 
+        self.ctx: BrowserContext | None = None # Isolated browser context
         self.page: Page | None = None # Active page object used by MCP tools
-        self._headless = headless # Run browser in headless mode 
-    
-    # Launch a new headless Chromium session 
+        self._headless = headless # Run browser in headless mode
+        self.block_resources = block_resources or [] # Resource types every new context blocks by default
+        self.block_urls = block_urls or [] # URL patterns every new context blocks by default
+
+    # Launch a new headless Chromium session
     async def start(self):
         self._pw = await async_playwright().start()
         self.browser = await self._pw.chromium.launch(headless=self._headless)
-        self.ctx = await self.browser.new_context()
-        self.page = await self.ctx.new_page()
+        self.ctx, self.page = await self.new_context()
+
+    # Open an isolated context + page on the shared browser process
+    async def new_context(self) -> tuple[BrowserContext, Page]:
+        assert self.browser is not None
+        ctx = await self.browser.new_context()
+        page = await ctx.new_page()
+        return ctx, page
+
+    # Request interception for a context, starts with the server wide defaults
+    async def new_blocker(self, ctx: BrowserContext) -> ResourceBlocker:
+        blocker = ResourceBlocker(self.block_resources, self.block_urls)
+        await blocker.attach(ctx)
+        return blocker
 
     # Close page, context and browser on shutdown
     async def stop(self):
-        if self.ctx: 
+        if self.ctx:
             await self.ctx.close()
-        if self.browser: 
+        if self.browser:
             await self.browser.close()
         if self._pw:
             await self._pw.stop()
+
+# One leased browser session -> own context, page and tools
+class BrowserSession:
+    def __init__(self, session_id: str, ctx: BrowserContext, page: Page, dumper: HtmlDumper | None = None,
+                 blocker: ResourceBlocker | None = None):
+        self.session_id = session_id
+        self.ctx = ctx
+        self.page = page
+        self.blocker = blocker or ResourceBlocker()
+        self.tools = Tools(page, dumper, self.blocker)
+        self.lock = asyncio.Lock() # Serializes tool calls on the same page
+        self.last_used = time.monotonic()
+
+    async def close(self):
+        await self.ctx.close()
+
+"""
+Pool of isolated BrowserContext/Page sessions on top of one BrowserManager.
+- The default session wraps the manager's own page and is never reaped
+- min_size contexts are kept warm so a new session id is served without startup cost
+- At most max_size leased sessions exist, idle ones are reaped after idle_timeout seconds
+- Sessions are only created through open(), calls naming an unknown (typo, closed, reaped) id fail
+"""
+class SessionPool:
+    def __init__(self, browser: BrowserManager, min_size: int = 1, max_size: int = 8, idle_timeout: float = 300.0,
+                 dumper: HtmlDumper | None = None):
+        self.browser = browser
+        self.dumper = dumper # Shared by the tools of every session
+        self.min_size = max(0, min_size)
+        self.max_size = max(1, max_size)
+        self.idle_timeout = idle_timeout
+        self._sessions: dict[str, BrowserSession] = {}
+        self._spare: list[tuple[BrowserContext, Page]] = []
+        self._create_lock = asyncio.Lock()
+        self._reaper: asyncio.Task | None = None
+        self._filler: asyncio.Task | None = None # Background spare refill, referenced so it is not garbage collected
+
+    async def start(self):
+        assert self.browser.ctx is not None and self.browser.page is not None
+        self._sessions[DEFAULT_SESSION_ID] = await self._new_session(DEFAULT_SESSION_ID, self.browser.ctx, self.browser.page)
+        await self._fill_spares()
+        self._reaper = asyncio.create_task(self._reap_loop())
+
+    async def stop(self):
+        for task in (self._reaper, self._filler):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        for session_id in list(self._sessions):
+            if session_id != DEFAULT_SESSION_ID:
+                await self.close(session_id)
+        for ctx, _ in self._spare:
+            await ctx.close()
+        self._spare.clear()
+
+    # Number of leased sessions excluding the default one
+    def size(self) -> int:
+        return len(self._sessions) - (1 if DEFAULT_SESSION_ID in self._sessions else 0)
+
+    def stats(self) -> dict:
+        return {
+            "sessions": [sid for sid in self._sessions if sid != DEFAULT_SESSION_ID],
+            "spare": len(self._spare),
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "idle_timeout": self.idle_timeout,
+        }
+
+    # Open a new session, optionally under a caller chosen id. An id that is already open belongs to
+    # another job and is refused, handing out its session would share its page and lock
+    async def open(self, session_id: str | None = None) -> BrowserSession:
+        async with self._create_lock:
+            session_id = session_id or uuid.uuid4().hex
+            if session_id in self._sessions:
+                raise SessionPoolError(f"Session '{session_id}' is already open")
+
+            if self.size() >= self.max_size and not await self._evict_idle():
+                raise SessionPoolError(f"Session pool exhausted (max {self.max_size} sessions)")
+
+            ctx, page = self._spare.pop() if self._spare else await self.browser.new_context()
+            session = await self._new_session(session_id, ctx, page)
+            self._sessions[session_id] = session
+
+        # Replenish the warm contexts outside of the request path
+        if self._filler is None or self._filler.done():
+            self._filler = asyncio.create_task(self._fill_spares())
+        return session
+
+    async def close(self, session_id: str) -> bool:
+        if session_id == DEFAULT_SESSION_ID:
+            return False
+        session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        async with session.lock:
+            await session.close()
+        return True
+
+    # Lease an open session for the duration of one call, unknown ids raise SessionPoolError
+    @asynccontextmanager
+    async def lease(self, session_id: str | None = None):
+        session_id = session_id or DEFAULT_SESSION_ID
+        session = self._sessions.get(session_id)
+        if session is None:
+            raise SessionPoolError(f"Session '{session_id}' not found, open it through /mcp/sessions/open first")
+        async with session.lock:
+            session.last_used = time.monotonic()
+            try:
+                yield session
+            finally:
+                session.last_used = time.monotonic()
+
+    async def _new_session(self, session_id: str, ctx: BrowserContext, page: Page) -> BrowserSession:
+        blocker = await self.browser.new_blocker(ctx)
+        return BrowserSession(session_id, ctx, page, self.dumper, blocker)
+
+    async def _fill_spares(self):
+        async with self._create_lock:
+            while len(self._spare) < self.min_size and self.size() + len(self._spare) < self.max_size:
+                self._spare.append(await self.browser.new_context())
+
+    """
+    Drop the least recently used session that has been idle for longer than idle_timeout, returns False
+    if there is none. Sessions idle for less still belong to a running job, e.g. between its batch and
+    its HTML stream request, and are never taken away from it.
+    """
+    async def _evict_idle(self) -> bool:
+        now = time.monotonic()
+        idle = [
+            s for sid, s in self._sessions.items()
+            if sid != DEFAULT_SESSION_ID and not s.lock.locked() and now - s.last_used > self.idle_timeout
+        ]
+        if not idle:
+            return False
+        victim = min(idle, key=lambda s: s.last_used)
+        self._sessions.pop(victim.session_id, None)
+        await victim.close()
+        return True
+
+    async def _reap_loop(self):
+        interval = max(1.0, self.idle_timeout / 2)
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            expired = [
+                sid for sid, s in self._sessions.items()
+                if sid != DEFAULT_SESSION_ID and not s.lock.locked() and now - s.last_used > self.idle_timeout
+            ]
+            for sid in expired:
+                await self.close(sid)
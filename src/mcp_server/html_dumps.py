@@ -0,0 +1,90 @@
+import asyncio
+import random
+import threading
+from datetime import datetime
+from enum import Enum
+from pathlib import Path
+from loguru import logger
+
+# When the html tool and failing tool calls write the page markup to disk
+class DumpMode(str, Enum):
+    OFF = "off" # Only when a call asks for it with dump=True
+    ALWAYS = "always" # Every html call
+    SAMPLE = "sample" # A random sample_rate share of html calls
+    ERROR = "error" # The page a failed tool call left behind
+
+"""
+Debug dumps of rendered HTML under out_dir.
+- Files are written in a worker thread and never awaited by the tool call that produced them
+- After every write the oldest dumps are removed until the directory holds at most
+  max_files files and max_bytes bytes
+"""
+class HtmlDumper:
+    def __init__(self, mode: str = "off", out_dir: str = "artifacts/html_dumps", sample_rate: float = 0.1,
+                 max_bytes: int = 200 * 1024 * 1024, max_files: int = 500):
+        self.mode = DumpMode(mode)
+        self.out_dir = Path(out_dir)
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self._pending: set[asyncio.Task] = set()
+        self._rotate_lock = threading.Lock()
+
+    # Should this html call be dumped, a per call dump flag wins over the mode
+    def wants_html(self, dump: bool | None = None) -> bool:
+        if dump is not None:
+            return dump
+        if self.mode == DumpMode.ALWAYS:
+            return True
+        if self.mode == DumpMode.SAMPLE:
+            return random.random() < self.sample_rate
+        return False
+
+    def wants_error(self) -> bool:
+        return self.mode == DumpMode.ERROR
+
+    # Schedule a background write, returns the path the dump will have
+    def dump(self, markup: str, prefix: str = "page", out_dir: str | None = None, file_name: str | None = None) -> str:
+        directory = Path(out_dir) if out_dir else self.out_dir
+        if not file_name:
+            stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            file_name = f"{prefix}_{stamp}.html"
+        file_path = directory / file_name
+
+        task = asyncio.create_task(asyncio.to_thread(self._write, file_path, markup))
+        self._pending.add(task)
+        task.add_done_callback(self._done)
+        return str(file_path)
+
+    # Wait for dumps still being written, used on shutdown
+    async def flush(self) -> None:
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+
+    def _done(self, task: asyncio.Task) -> None:
+        self._pending.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"HTML dump failed: {task.exception()}")
+
+    def _write(self, file_path: Path, markup: str) -> None:
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(markup, encoding="utf-8")
+        self._rotate(file_path.parent)
+
+    # Remove the oldest dumps until the directory is within its file count and size budget
+    def _rotate(self, directory: Path) -> None:
+        with self._rotate_lock:
+            files = []
+            for path in directory.glob("*.html"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+            files.sort()
+
+            total = sum(size for _, size, _ in files)
+            while files and (len(files) > self.max_files or total > self.max_bytes):
+                _, size, path = files.pop(0)
+                path.unlink(missing_ok=True)
+                total -= size
@@ -14,4 +14,26 @@ class ListResponse(BaseModel):
 # Request model sent by the MCP client aka Agent to invoke a specific tool 
 class CallRequest(BaseModel):
     tool: str # Name of the tool to call
-    params: dict # Arguments passed to the tool
\ No newline at end of file
+    params: dict # Arguments passed to the tool
+    session_id: Optional[str] = None # Leased browser session, None uses the shared default session
+
+# Request model to open or close a leased browser session
+class SessionRequest(BaseModel):
+    session_id: Optional[str] = None # Caller chosen id, a random id is generated when omitted
+
+# One step of a batched call
+class ToolCall(BaseModel):
+    tool: str # Name of the tool to call
+    params: dict = {} # Arguments passed to the tool
+
+# Ordered tool calls executed on one session in a single HTTP round trip
+class BatchRequest(BaseModel):
+    calls: list[ToolCall] # Executed in order
+    session_id: Optional[str] = None # Leased browser session, None uses the shared default session
+    stop_on_error: bool = True # Skip the remaining calls after the first failed one
+
+# Response of a batched call, one ToolResponse per executed call
+class BatchResponse(BaseModel):
+    ok: bool # True if every executed call succeeded
+    results: list[ToolResponse] = [] # In call order, shorter than calls when the batch stopped early
+    error: Optional[str] = None # Error of the first failed call
@@ -1,18 +1,147 @@
+import asyncio
+import time
 from pathlib import Path
+from loguru import logger
 from datetime import datetime
 from .schemas import ToolResponse
+from .html_dumps import HtmlDumper
+from .blocking import ResourceBlocker
+
+
+"""
+Evaluates a serialized SelectorPlan in the page, mirroring the agent's selector engine:
+- containers = item_selector matches, the whole document without a usable item selector
+- per field the first candidate (primary, then fallback) whose first match in the container
+  has a value wins, img -> src, a -> href, otherwise the element's whitespace joined text
+Rows only carry [value, candidate index] per field so the response stays small.
+"""
+_EXTRACT_JS = """
+(plan) => {
+    const SKIP = new Set(["SCRIPT", "STYLE", "TEMPLATE"]);
+    const text = (el) => {
+        const parts = [];
+        const walker = document.createTreeWalker(el, NodeFilter.SHOW_TEXT);
+        for (let node = walker.nextNode(); node; node = walker.nextNode()) {
+            let skip = false;
+            for (let p = node.parentElement; p && p !== el.parentElement; p = p.parentElement) {
+                if (SKIP.has(p.tagName)) { skip = true; break; }
+            }
+            const t = node.data.trim();
+            if (!skip && t) parts.push(t);
+        }
+        return parts.join(" ");
+    };
+    const value = (el) => {
+        const tag = el.tagName.toLowerCase();
+        for (const [name, attr] of [["img", "src"], ["a", "href"]]) {
+            if (tag === name && el.hasAttribute(attr)) {
+                return el.getAttribute(attr).trim() || null;
+            }
+        }
+        return text(el) || null;
+    };
+    const first = (scope, sel) => {
+        try { return scope.querySelector(sel); } catch (e) { return null; }
+    };
+
+    let containers = [document];
+    if (plan.item_selector) {
+        try { containers = Array.from(document.querySelectorAll(plan.item_selector)); } catch (e) {}
+    }
+
+    const fields = Object.keys(plan.field_selectors);
+    const rows = containers.map((container) => fields.map((field) => {
+        const candidates = plan.field_selectors[field].concat((plan.fallback_selectors || {})[field] || []);
+        for (let i = 0; i < candidates.length; i++) {
+            const el = first(container, candidates[i]);
+            const v = el ? value(el) : null;
+            if (v) return [v, i];
+        }
+        return null;
+    }));
+    return {fields: fields, rows: rows};
+}
+"""
+
+# Same next link strategies as the agent's _find_next_link, for pages that never leave the browser
+_NEXT_LINK_JS = """
+() => {
+    const href = (a) => a ? a.getAttribute("href") : null;
+    let a = document.querySelector("a[rel='next']");
+    if (href(a)) return href(a);
+    a = document.querySelector("a[aria-label*='next' i]");
+    if (href(a)) return href(a);
+    for (const cand of document.querySelectorAll("a[href]")) {
+        const txt = cand.textContent.replace(/\\s+/g, " ").trim().toLowerCase();
+        if (txt.includes("next") || txt.endsWith("\u00bb")) return href(cand);
+    }
+    a = document.querySelector("li.next a[href], .pagination a.next[href], .pager a.next[href]");
+    return href(a);
+}
+"""
+
+
+# Load states page.goto can wait for
+WAIT_UNTIL_STATES = {"commit", "domcontentloaded", "load", "networkidle"}
 
 
 class Tools: 
-    def __init__(self, page):
+    def __init__(self, page, dumper: HtmlDumper | None = None, blocker: ResourceBlocker | None = None):
         self.page = page
+        self.dumper = dumper or HtmlDumper() # Debug HTML dumps, off unless configured or asked for per call
+        self.blocker = blocker or ResourceBlocker() # Request interception of the page's context
 
-    async def navigate(self, url: str, timeout_ms: int = 20000) -> ToolResponse:
+    """
+    Navigates to url and waits for the wait_until load state. With wait_for_selector the call
+    also waits until that selector is in the DOM, capped at wait_timeout_ms; hitting the cap is
+    not an error, data.ready tells whether the page became ready in time.
+    """
+    async def navigate(self, url: str, timeout_ms: int = 20000, wait_until: str = "domcontentloaded",
+                       wait_for_selector: str | None = None, wait_timeout_ms: int = 5000) -> ToolResponse:
+        if wait_until not in WAIT_UNTIL_STATES:
+            return ToolResponse(ok=False, error=f"wait_until must be one of {sorted(WAIT_UNTIL_STATES)}")
         try: 
-            await self.page.goto(url, timeout=timeout_ms, wait_until="domcontentloaded")
-            return ToolResponse(ok=True, data={"url": url})
+            await self.page.goto(url, timeout=timeout_ms, wait_until=wait_until)
+            data = {"url": url}
+            if wait_for_selector:
+                data.update(await self._wait_ready(wait_for_selector, False, wait_timeout_ms))
+            return ToolResponse(ok=True, data=data)
         except Exception as e:
             return ToolResponse(ok=False, error=str(e))
+
+    """
+    Waits until selector is attached to the DOM or, with network_idle, until the network goes
+    idle, whichever happens first, but at most timeout_ms. Without either condition it only
+    waits for network idle. A timeout is reported as ready=False, not as an error.
+    """
+    async def wait_for(self, selector: str | None = None, network_idle: bool = False, timeout_ms: int = 5000) -> ToolResponse:
+        try:
+            return ToolResponse(ok=True, data=await self._wait_ready(selector, network_idle or not selector, timeout_ms))
+        except Exception as e:
+            return ToolResponse(ok=False, error=str(e))
+
+    async def _wait_ready(self, selector: str | None, network_idle: bool, timeout_ms: int) -> dict:
+        start = time.perf_counter()
+        waiters = {}
+        if selector:
+            waiters["selector"] = asyncio.create_task(self.page.wait_for_selector(selector, state="attached", timeout=timeout_ms))
+        if network_idle:
+            waiters["networkidle"] = asyncio.create_task(self.page.wait_for_load_state("networkidle", timeout=timeout_ms))
+
+        ready_by = None
+        pending = set(waiters.values())
+        while pending and ready_by is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for name, task in waiters.items():
+                # A waiter that timed out or failed (e.g. invalid selector) just lets the others continue
+                if task in done and not task.cancelled() and task.exception() is None:
+                    ready_by = name
+                    break
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+        return {"ready": ready_by is not None, "ready_by": ready_by, "waited_ms": int((time.perf_counter() - start) * 1000)}
     
     async def screenshot(self, full_page: 
         bool = False, file_name: str | None = None, 
@@ -109,25 +238,35 @@ class Tools:
         except Exception as e:
             return ToolResponse(ok=False, error=str(e)) 
     
-    async def html(self, out_dir: str= "artifacts/html_dumps", file_name: str | None = None) -> ToolResponse: 
+    """
+    Returns the rendered markup. Writing a debug dump is decided by the server's dump mode
+    (MCP_HTML_DUMP) unless the call passes dump=True/False, dumps are written in the background
+    and html_path is only included when one was scheduled.
+    """
+    async def html(self, dump: bool | None = None, out_dir: str | None = None, file_name: str | None = None) -> ToolResponse: 
         try: 
             markup = await self.page.content()
-            # Save html dumps for debugging
-            out_path = Path(out_dir)
-            out_path.mkdir(parents=True, exist_ok=True)
+            data = {"html": markup}
 
-            if not file_name: 
-                stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                file_name = f"page_{stamp}.html"
-            
-            file_path = out_path / file_name
-            # Write the result into the target file
-            file_path.write_text(markup, encoding="utf-8")
+            # An explicit target file counts as asking for a dump
+            if self.dumper.wants_html(True if file_name and dump is None else dump):
+                data["html_path"] = self.dumper.dump(markup, out_dir=out_dir, file_name=file_name)
 
-            return ToolResponse(ok=True, data={"html_path": str(file_path), "message": "HTML saved successfully", "html": markup})
+            return ToolResponse(ok=True, data=data)
         
         except Exception as e:
             return ToolResponse(ok=False, error=str(e))
+
+    # Dump whatever page a failed tool call left behind, only in the 'error' dump mode
+    async def dump_on_error(self, tool: str) -> None:
+        if not self.dumper.wants_error():
+            return
+        try:
+            markup = await self.page.content()
+        except Exception:
+            return
+        path = self.dumper.dump(markup, prefix=f"error_{tool}")
+        logger.info(f"HTML dump after failed '{tool}' -> {path}")
     
     async def scroll(self, direction: str = "bottom") -> ToolResponse:
         # Scroll in the target direction (bottom/top)
@@ -148,3 +287,40 @@ class Tools:
         except Exception as e:
             return ToolResponse(ok=False, error=str(e))
 
+    # Server side pause, lets a batch wait between interactions without an extra round trip
+    async def wait(self, duration_ms: int = 0) -> ToolResponse:
+        try:
+            await self.page.wait_for_timeout(duration_ms)
+            return ToolResponse(ok=True, data={"duration_ms": duration_ms})
+        except Exception as e:
+            return ToolResponse(ok=False, error=str(e))
+
+    # Runs a SelectorPlan in the page and returns raw values per item instead of the whole DOM
+    async def extract(self, item_selector: str | None, field_selectors: dict, fallback_selectors: dict | None = None,
+                      next_link: bool = False) -> ToolResponse:
+        try:
+            plan = {"item_selector": item_selector, "field_selectors": field_selectors, "fallback_selectors": fallback_selectors or {}}
+            data = await self.page.evaluate(_EXTRACT_JS, plan)
+            if next_link:
+                data["next_href"] = await self.page.evaluate(_NEXT_LINK_JS)
+            return ToolResponse(ok=True, data=data)
+        except Exception as e:
+            return ToolResponse(ok=False, error=str(e))
+
+    # Replace the resource types and URL patterns this session blocks, empty lists block nothing
+    async def block_resources(self, resource_types: list[str] | None = None, url_patterns: list[str] | None = None) -> ToolResponse:
+        try:
+            await self.blocker.configure(resource_types or [], url_patterns or [])
+            return ToolResponse(ok=True, data={
+                "resource_types": sorted(self.blocker.resource_types),
+                "url_patterns": self.blocker.url_patterns,
+            })
+        except Exception as e:
+            return ToolResponse(ok=False, error=str(e))
+
+    # Requests blocked and loaded on this session so far, reset=True starts a new count
+    async def resource_stats(self, reset: bool = False) -> ToolResponse:
+        stats = self.blocker.stats()
+        if reset:
+            self.blocker.reset_stats()
+        return ToolResponse(ok=True, data=stats)
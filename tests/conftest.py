@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Tests import the code as src.agent... / src.mcp_server..., like the demos run from the repo root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
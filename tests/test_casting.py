@@ -0,0 +1,45 @@
+import pytest
+
+from src.agent.extractor import caster_for
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("€1,099.50", 1099.5),
+    ("1.299,00 €", 1299),
+    ("12,50", 12.5),
+    ("$899.99", 899.99),
+    ("1'250.50 CHF", 1250.5),
+    ("€1 299", 1299),
+    ("EUR 1 299", 1299),
+    ("1 299 SEK", 1299),
+    ("1 299,00 kr", 1299),
+    ("1 299,50", 1299.5),
+    ("Pack of 2 100ml", 2),
+    ("3 250 g", 3),
+    ("version 2 100", 2),
+    ("no price", None),
+    ("", None),
+])
+def test_numbers(text, expected):
+    assert caster_for("number")(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("In stock", True),
+    ("Available", True),
+    ("In stock - no fees", True),
+    ("Ships in 0-2 days, in stock", True),
+    ("Out of stock", False),
+    ("Unavailable", False),
+    ("Not available", False),
+    ("Sold out - yes, really", False),
+    ("yes", True),
+    (" No ", False),
+    ("0", False),
+    ("1", True),
+    ("No fees", None),
+    ("Ships in 0-2 days", None),
+    (None, None),
+])
+def test_booleans(text, expected):
+    assert caster_for("boolean")(text) is expected
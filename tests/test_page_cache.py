@@ -0,0 +1,50 @@
+from src.agent.cpu_pool import ExtractedPage
+from src.agent.page_cache import PageCache
+from src.agent.quality import QualityAccumulator
+from src.agent.select_planner import SelectorPlan
+
+PLAN = SelectorPlan(".product", {"name": [".name"]})
+FIELDS = {"name": "string"}
+
+
+def page(i: int) -> ExtractedPage:
+    return ExtractedPage([{"name": f"Laptop {i}" * 20}], {"quality": QualityAccumulator(), "selector_hits": {}}, None, 1000)
+
+
+def store(cache: PageCache, i: int) -> None:
+    url, html_hash = f"https://shop.test/p{i}", f"hash-{i}"
+    cache.store(cache.key(url, html_hash, PLAN, FIELDS), url, page(i))
+    cache.store_validators(url, {"etag": f'"v{i}"' + " " * 200}, html_hash)
+
+
+def disk_bytes(cache: PageCache) -> int:
+    return sum(path.stat().st_size for path in cache.cache_dir.rglob("*.json"))
+
+
+def test_validators_count_towards_max_bytes(tmp_path):
+    cache = PageCache(str(tmp_path), max_bytes=2000)
+    for i in range(20):
+        store(cache, i)
+    assert disk_bytes(cache) <= 2000
+    assert len(list((tmp_path / "validators").glob("*.json"))) < 20
+    # The newest page still revalidates
+    validators = cache.validators("https://shop.test/p19", PLAN, FIELDS)
+    assert validators["html_hash"] == "hash-19"
+    assert cache.revalidated("https://shop.test/p19", validators, PLAN, FIELDS) is not None
+
+
+def test_validators_are_indexed_between_runs(tmp_path):
+    store(PageCache(str(tmp_path)), 0)
+    cache = PageCache(str(tmp_path), max_bytes=1)
+    store(cache, 1)
+    # Everything but the newest file, the validators just written, is evicted, the earlier run's too
+    assert [p.name for p in tmp_path.rglob("*.json")] == [cache._validators_path("https://shop.test/p1").name]
+
+
+def test_forgotten_validators_free_their_bytes(tmp_path):
+    cache = PageCache(str(tmp_path))
+    store(cache, 0)
+    before = cache._total_bytes
+    cache.store_validators("https://shop.test/p0", {}, "hash-0")
+    assert cache._total_bytes < before
+    assert cache._total_bytes == disk_bytes(cache)
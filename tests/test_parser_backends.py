@@ -0,0 +1,43 @@
+import pytest
+
+from src.agent.document import ParsedDocument
+
+HTML = """<html><body><main id="list">
+  <div class="card"><h3 class="name">Laptop X</h3><span class="price">899.99</span></div>
+  <span class="badge">Sale</span>
+  <div class="card"><h3 class="name">Laptop Y</h3><span class="badge">New</span></div>
+</main></body></html>"""
+
+
+def texts(doc, css, scope=None):
+    return [doc.backend.text(el) for el in doc.select(css, scope)]
+
+
+@pytest.mark.parametrize("css", [
+    ".card ~ .badge",    # sibling combinator reaching past the scope
+    ".card + .badge",
+    "body .price",       # ancestor outside the scope
+    "#list > .card .name",
+    ".card ~ .card .badge",
+    ".price",
+    "*",
+])
+def test_scoped_select_matches_across_backends(css):
+    results = {}
+    for backend in ("bs4", "lxml"):
+        doc = ParsedDocument(HTML, backend=backend)
+        results[backend] = [texts(doc, css, card) for card in doc.select(".card")]
+    assert results["lxml"] == results["bs4"]
+
+
+def test_scoped_select_stays_inside_the_scope():
+    doc = ParsedDocument(HTML, backend="lxml")
+    first, second = doc.select(".card")
+    assert texts(doc, ".card ~ .badge", first) == []
+    assert texts(doc, "body .price", first) == ["899.99"]
+    assert texts(doc, ".card ~ .card .badge", second) == ["New"]
+
+
+def test_document_select_matches_across_backends():
+    for css in ("html", "body > main > .card", ".badge"):
+        assert texts(ParsedDocument(HTML, backend="lxml"), css) == texts(ParsedDocument(HTML, backend="bs4"), css)
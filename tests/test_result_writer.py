@@ -0,0 +1,39 @@
+import json
+
+import pytest
+
+from src.agent.result_writer import JsonArrayResultWriter, ResultWriter, open_writer
+
+
+def test_incomplete_writer_fails_when_created(tmp_path):
+    class NoTail(ResultWriter):
+        def _write_item(self, item):
+            pass
+
+    with pytest.raises(TypeError):
+        NoTail(str(tmp_path / "out.json"), "products")
+
+
+def test_json_writer_streams_pages_into_one_document(tmp_path):
+    path = tmp_path / "out.json"
+    writer = open_writer("json", str(path), "products")
+    assert isinstance(writer, JsonArrayResultWriter)
+    writer.write_page([{"name": "A"}, {"name": "B"}])
+    writer.write_page([{"name": "C"}])
+    writer.close({"status": "success", "metadata": {"num_results": 3}, "quality_report": {"total_items": 3}})
+
+    doc = json.loads(path.read_text(encoding="utf-8"))
+    assert [item["name"] for item in doc["data"]["products"]] == ["A", "B", "C"]
+    assert doc["data"]["metadata"] == {"num_results": 3}
+    assert doc["status"] == "success"
+    assert writer.items_written == 3
+
+
+def test_ndjson_writer_ends_with_the_tail(tmp_path):
+    path = tmp_path / "out.ndjson"
+    writer = open_writer("ndjson", str(path), "products")
+    writer.write_page([{"name": "A"}])
+    writer.close({"status": "error", "error": "boom"})
+
+    lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert lines == [{"name": "A"}, {"status": "error", "error": "boom"}]
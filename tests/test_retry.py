@@ -0,0 +1,166 @@
+import asyncio
+
+import pytest
+
+from src.agent.retry import CircuitBreaker, CircuitOpenError, RetryBudget, retry_async
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class Transient(Exception):
+    retryable = True
+
+
+class Permanent(Exception):
+    retryable = False
+
+
+def failing(exc: Exception, times: int, result: str = "ok"):
+    calls = {"n": 0}
+
+    async def func():
+        calls["n"] += 1
+        if calls["n"] <= times:
+            raise exc
+        return result
+
+    return func, calls
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_backoff_grows_by_factor_and_is_capped():
+    sleeps = []
+
+    async def sleep(delay):
+        sleeps.append(delay)
+
+    func, calls = failing(Transient("503"), times=4)
+    result = run(retry_async(func, retries=4, base_delay=1.0, factor=2.0, max_delay=5.0, sleep=sleep, rand=lambda: 1.0))
+    assert result == "ok"
+    assert calls["n"] == 5
+    assert sleeps == [1.0, 2.0, 4.0, 5.0]
+
+
+def test_full_jitter_scales_the_delay():
+    sleeps = []
+
+    async def sleep(delay):
+        sleeps.append(delay)
+
+    func, _ = failing(Transient("503"), times=2)
+    run(retry_async(func, retries=3, base_delay=1.0, factor=2.0, sleep=sleep, rand=lambda: 0.25))
+    assert sleeps == [0.25, 0.5]
+
+
+def test_non_retryable_error_is_raised_at_once():
+    sleeps = []
+
+    async def sleep(delay):
+        sleeps.append(delay)
+
+    func, calls = failing(Permanent("Element not found"), times=1)
+    with pytest.raises(Permanent):
+        run(retry_async(func, retries=3, sleep=sleep))
+    assert calls["n"] == 1
+    assert sleeps == []
+
+
+def test_budget_is_shared_and_stops_retries():
+    async def sleep(delay):
+        pass
+
+    budget = RetryBudget(max_retries=3)
+    func, calls = failing(Transient("timeout"), times=2)
+    assert run(retry_async(func, retries=5, budget=budget, sleep=sleep)) == "ok"
+    assert budget.remaining == 1
+
+    func, calls = failing(Transient("timeout"), times=10)
+    with pytest.raises(Transient):
+        run(retry_async(func, retries=5, budget=budget, sleep=sleep))
+    assert calls["n"] == 2 # one retry left in the budget
+    assert budget.remaining == 0
+
+
+def test_breaker_opens_half_opens_and_closes():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+    breaker.record_failure("h")
+    assert breaker.state("h") == "closed"
+    breaker.record_failure("h")
+    assert breaker.state("h") == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.check("h")
+
+    clock.now = 10
+    assert breaker.state("h") == "half_open"
+    breaker.check("h") # the probe
+    with pytest.raises(CircuitOpenError):
+        breaker.check("h") # only one probe at a time
+    breaker.record_success("h")
+    assert breaker.state("h") == "closed"
+    assert breaker.open_hosts() == []
+
+
+def test_failed_probe_opens_the_circuit_again():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+
+    async def sleep(delay):
+        pass
+
+    func, _ = failing(Transient("timeout"), times=10)
+    with pytest.raises(Transient):
+        run(retry_async(func, retries=0, breaker=breaker, host="h", sleep=sleep))
+    clock.now = 10
+    with pytest.raises(Transient):
+        run(retry_async(func, retries=0, breaker=breaker, host="h", sleep=sleep))
+    assert breaker.state("h") == "open"
+
+
+def test_non_transient_probe_closes_the_circuit():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker.record_failure("h")
+    clock.now = 10
+
+    func, _ = failing(Permanent("Element not found"), times=1)
+    with pytest.raises(Permanent):
+        run(retry_async(func, retries=3, breaker=breaker, host="h"))
+    assert breaker.state("h") == "closed"
+
+    ok, calls = failing(Permanent("unused"), times=0)
+    assert run(retry_async(ok, breaker=breaker, host="h")) == "ok"
+    assert calls["n"] == 1
+
+
+def test_cancelled_probe_frees_the_half_open_slot():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker.record_failure("h")
+    clock.now = 10
+
+    async def main():
+        started = asyncio.Event()
+
+        async def hang():
+            started.set()
+            await asyncio.sleep(3600)
+
+        task = asyncio.create_task(retry_async(hang, breaker=breaker, host="h"))
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    run(main())
+    assert breaker.state("h") == "half_open"
+    breaker.check("h") # the next caller may probe again
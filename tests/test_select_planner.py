@@ -0,0 +1,54 @@
+import pytest
+
+from src.agent.select_planner import SelectorPlanner
+
+FIELDS = {"name": "string", "price": "number"}
+
+
+def cards_with_specs(num_cards: int, specs_per_card: int) -> str:
+    cards = []
+    for i in range(num_cards):
+        specs = "".join(
+            f'<li class="spec"><span class="spec-key">Key {j}</span><span class="spec-value">Value {j}</span></li>'
+            for j in range(specs_per_card)
+        )
+        cards.append(f"""
+      <div class="product-card">
+        <h3 class="product-name">Laptop {i}</h3>
+        <span class="product-price">${500 + i}.99</span>
+        <ul class="specs">{specs}</ul>
+      </div>""")
+    return f"<html><body><main>{''.join(cards)}</main></body></html>"
+
+
+def grid(num_items: int, per_row: int) -> str:
+    rows = []
+    for start in range(0, num_items, per_row):
+        tiles = "".join(
+            f'<div class="tile"><h3>Laptop {i}</h3><span class="amount">${500 + i}.99</span></div>'
+            for i in range(start, min(start + per_row, num_items))
+        )
+        rows.append(f'<div class="grid-row">{tiles}</div>')
+    return f"<html><body><main>{''.join(rows)}</main></body></html>"
+
+
+@pytest.mark.parametrize("backend", ["bs4", "lxml"])
+@pytest.mark.parametrize("num_cards, specs_per_card", [(20, 4), (10, 6), (3, 5)])
+def test_spec_rows_inside_cards_are_not_the_records(backend, num_cards, specs_per_card):
+    plan = SelectorPlanner(cards_with_specs(num_cards, specs_per_card), "products", FIELDS, backend=backend).build_plan()
+    assert plan.item_selector == ".product-card"
+
+
+@pytest.mark.parametrize("backend", ["bs4", "lxml"])
+@pytest.mark.parametrize("per_row", [2, 4])
+def test_cards_split_over_grid_rows_are_the_records(backend, per_row):
+    plan = SelectorPlanner(grid(12, per_row), "products", FIELDS, backend=backend).build_plan()
+    assert plan.item_selector == ".tile"
+
+
+def test_classes_are_discovered_once():
+    html = '<div class="card"><span class="price">1</span><span class="price">2</span></div>'
+    planner = SelectorPlanner(html, None, FIELDS)
+    found = planner._node_selectors([planner.document.root])
+    assert list(found).count(".price") == 1
+    assert found[".price"] == {"price"}
@@ -0,0 +1,110 @@
+import asyncio
+import time
+
+import pytest
+
+from src.mcp_server.blocking import ResourceBlocker
+from src.mcp_server.browser import BrowserManager, SessionPool, SessionPoolError
+
+
+class FakeContext:
+    def __init__(self):
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeManager(BrowserManager):
+    """Hands out fake contexts instead of launching Chromium."""
+
+    async def start(self):
+        self.browser = object()
+        self.ctx, self.page = await self.new_context()
+
+    async def new_context(self):
+        return FakeContext(), object()
+
+    async def new_blocker(self, ctx):
+        return ResourceBlocker()
+
+    async def stop(self):
+        pass
+
+
+def with_pool(test, **pool_args):
+    async def main():
+        manager = FakeManager()
+        await manager.start()
+        pool = SessionPool(manager, **pool_args)
+        await pool.start()
+        try:
+            await test(pool)
+        finally:
+            await pool.stop()
+
+    asyncio.run(main())
+
+
+def test_unknown_session_id_is_not_opened():
+    async def test(pool):
+        with pytest.raises(SessionPoolError, match="not found"):
+            async with pool.lease("typo"):
+                pass
+        assert pool.size() == 0
+
+        session = await pool.open("job-1")
+        async with pool.lease("job-1") as leased:
+            assert leased is session
+        async with pool.lease() as default:
+            assert default.session_id == "default"
+
+    with_pool(test, min_size=0, max_size=2)
+
+
+def test_open_refuses_an_id_that_is_already_open():
+    async def test(pool):
+        await pool.open("job-1")
+        with pytest.raises(SessionPoolError, match="already open"):
+            await pool.open("job-1")
+        with pytest.raises(SessionPoolError, match="already open"):
+            await pool.open("default")
+        assert pool.size() == 1
+
+    with_pool(test, min_size=0, max_size=2)
+
+
+def test_full_pool_keeps_recently_used_sessions():
+    async def test(pool):
+        first = await pool.open("job-1")
+        with pytest.raises(SessionPoolError, match="exhausted"):
+            await pool.open("job-2")
+        # Between a job's batch and its stream request the session is idle but still in use
+        async with pool.lease("job-1") as leased:
+            assert leased is first
+        assert not first.ctx.closed
+
+    with_pool(test, min_size=0, max_size=1, idle_timeout=60)
+
+
+def test_full_pool_evicts_sessions_past_the_idle_timeout():
+    async def test(pool):
+        first = await pool.open("job-1")
+        first.last_used = time.monotonic() - 120
+        second = await pool.open("job-2")
+        assert first.ctx.closed
+        assert pool.stats()["sessions"] == ["job-2"]
+        async with pool.lease("job-2") as leased:
+            assert leased is second
+
+    with_pool(test, min_size=0, max_size=1, idle_timeout=60)
+
+
+def test_spare_refill_task_is_kept():
+    async def test(pool):
+        await pool.open("job-1")
+        assert pool._filler is not None
+        await pool._filler
+        assert pool.stats()["spare"] == 1
+
+    with_pool(test, min_size=1, max_size=4)